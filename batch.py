@@ -0,0 +1,256 @@
+from operator import itemgetter
+from random import randrange
+
+from sweeper import Board
+
+#Cell values in the visible observation, besides the numbers 0 to 8
+CLOSED = 9
+FLAGGED = 10
+BOMB = 11
+
+#Observation values from sums of count + 16*bomb + 32*closed + 64*flagged
+_CLOSED_PLANE = bytes.maketrans(b'\x00\x01', b'\x20\x00')
+_VISIBLE = bytes(range(9)) + bytes([0])*7 + bytes([BOMB])*16 + bytes([CLOSED])*32 + bytes([FLAGGED])*192
+
+#What a click does, from sums of count + 16*bomb + 32*revealed + 64*flagged + 128*undealt for the tile clicked
+_KEEP_SHUT = 0
+_SEEN = 1
+_OPEN = 2
+_FALLBACK = 3
+_UNDEALT = bytes.maketrans(b'\x00\x01', b'\x80\x00')
+
+def _click_action(code):
+    if code & 64:
+        return _KEEP_SHUT
+    if code & (128 | 16) or code & 15 == 0:
+        return _FALLBACK
+    return _SEEN if code & 32 else _OPEN
+
+_CLICKS = bytes(_click_action(code) for code in range(256))
+
+#The bytes of a plane at the given indexes, picked out in one go
+def _gather(plane, indexes):
+    if len(indexes) == 1:
+        return bytes([plane[indexes[0]]])
+    return bytes(itemgetter(*indexes)(plane))
+
+#N boards of the same size and bomb count stepped together, for training and analysis runs that play many games in
+#lockstep. The boards are stacked one under another in the planes of a single tall Board, with a flagged row
+#between each pair: it holds no bombs, so the counts of one board never see the next, and the cascade never opens
+#a flagged tile, so a fill can't run from one board into the next. Bomb counting and the observations work on
+#the whole stack at once. A step sorts its moves out in bulk as well, reading the tiles it touches from every plane
+#at once: flags, and clicks on numbers of boards already dealt, are settled from that alone, and only the moves
+#that can open more than one tile or end a game, cascades, chords, bombs and first clicks, go board by board.
+#Board k behaves exactly like Board(width, height, bombs, seeds[k], lazy), see board(k)
+class BoardBatch:
+    def __init__(self, count, width=30, height=16, bombs=99, seeds=None, lazy=False):
+        if seeds is None:
+            seeds = [randrange(1 << 32) for _ in range(count)]
+        assert len(seeds) == count, "Every board needs a seed"
+
+        self.count = count
+        self.width = width
+        self.height = height
+        self.bomb_count = bombs
+        self.seeds = list(seeds)
+        self.lazy = lazy
+
+        cells = width*height
+        self.cells = cells
+        self.stride = cells + width
+        gutter = b'\x00'*width
+
+        if lazy:
+            self.generated = bytearray(count)
+            mines = bytearray(count*self.stride)
+        else:
+            self.generated = bytearray(b'\x01')*count
+            mines = bytearray().join(Board.gen_board(width, height, bombs, seed) + gutter for seed in seeds)
+
+        self.grid = grid = Board.from_mines(width, count*(height+1), mines, seed=0)
+        for k in range(count):
+            grid.flags[k*self.stride + cells:(k+1)*self.stride] = b'\x01'*width
+
+        self.opened = [0]*count
+        self.flagged = [0]*count
+
+        #Tiles are numbered the same on every board, so neighbours and safe cells come from one blank board
+        self.template = Board(width, height, bombs, seed=0, lazy=True)
+
+    def __repr__(self):
+        return 'BoardBatch(count={}, width={}, height={}, bombs={}, lazy={})'.format(self.count, self.width, self.height, self.bomb_count, self.lazy)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def won(self):
+        safe = self.cells - self.bomb_count
+        return [opened == safe for opened in self.opened]
+
+    #Deal the bombs of lazy board k around its first click
+    def place_mines(self, k, x, y):
+        width = self.width
+        height = self.height
+
+        mines = Board.gen_board(width, height, self.bomb_count, self.seeds[k], self.template.safe_cells(x, y))
+        base = k*self.stride
+        self.grid.mines[base:base+self.cells] = mines
+        self.grid.counts[base:base+self.cells] = Board.count_board(width, height, mines)
+        self.generated[k] = 1
+
+    #Reveal every bomb of board k that hasn't been flagged, as one OR over the board's slice of the planes
+    def reveal_mines(self, k):
+        grid = self.grid
+        base = k*self.stride
+        end = base + self.cells
+
+        mines = int.from_bytes(grid.mines[base:end], 'little') & ~int.from_bytes(grid.flags[base:end], 'little')
+        grid.revealed[base:end] = (int.from_bytes(grid.revealed[base:end], 'little') | mines).to_bytes(self.cells, 'little')
+
+    #Board.open_tile for board k
+    def open_tile(self, k, x, y):
+        grid = self.grid
+        i = k*self.stride + y*self.width + x
+        if grid.flags[i]:
+            return None
+
+        if not self.generated[k]:
+            self.place_mines(k, x, y)
+
+        if not grid.revealed[i]:
+            grid.revealed[i] = 1
+            if not grid.mines[i]:
+                self.opened[k] += 1
+        if grid.mines[i]:
+            self.reveal_mines(k)
+            return 1
+
+        if grid.counts[i] == 0:
+            self.opened[k] += len(grid.cascade(x, k*(self.height+1) + y))
+
+        return 0
+
+    #Board.auto_click for board k. Neighbours come from the template so the flagged rows between boards aren't counted
+    def chord_tile(self, k, x, y):
+        grid = self.grid
+        base = k*self.stride
+        width = self.width
+        i = base + y*width + x
+
+        results = []
+        neighbours = list(self.template.neighbours(x, y))
+        if grid.revealed[i] and sum(grid.flags[base+n] for n in neighbours) == grid.counts[i]:
+            for n in neighbours:
+                results.append(self.open_tile(k, n % width, n // width))
+
+        return any(results)
+
+    #Make a move on every board. ops, xs and ys hold one entry per board, op being 'click', 'flag' or 'chord' like a
+    #simulate.py policy, and a board whose op is None sits the step out. Returns each board's result as its
+    #Board method would, None for boards that didn't move
+    def step(self, ops, xs, ys):
+        moves = {'click': [], 'flag': [], 'chord': []}
+        for k, op in enumerate(ops):
+            if op is not None:
+                moves[op].append(k)
+
+        results = [None]*self.count
+        if moves['click']:
+            self.click_tiles(moves['click'], xs, ys, results)
+        if moves['flag']:
+            self.flag_tiles(moves['flag'], xs, ys, results)
+        for k in moves['chord']:
+            results[k] = self.chord_tile(k, xs[k], ys[k])
+
+        return results
+
+    #Board.click for boards ks. Flagged tiles and numbers are handled here, the rest falls back to open_tile
+    def click_tiles(self, ks, xs, ys, results):
+        grid = self.grid
+        width = self.width
+        stride = self.stride
+        indexes = [k*stride + ys[k]*width + xs[k] for k in ks]
+
+        code = (int.from_bytes(_gather(grid.counts, indexes), 'little') + (int.from_bytes(_gather(grid.mines, indexes), 'little') << 4) +
+                (int.from_bytes(_gather(grid.revealed, indexes), 'little') << 5) + (int.from_bytes(_gather(grid.flags, indexes), 'little') << 6) +
+                int.from_bytes(_gather(self.generated, ks).translate(_UNDEALT), 'little'))
+        actions = code.to_bytes(len(ks), 'little').translate(_CLICKS)
+
+        revealed = grid.revealed
+        opened = self.opened
+        for k, i, action in zip(ks, indexes, actions):
+            if action == _OPEN:
+                revealed[i] = 1
+                opened[k] += 1
+                results[k] = 0
+            elif action == _SEEN:
+                results[k] = 0
+            elif action == _FALLBACK:
+                results[k] = self.open_tile(k, xs[k], ys[k])
+
+    #Board.flag for boards ks
+    def flag_tiles(self, ks, xs, ys, results):
+        grid = self.grid
+        width = self.width
+        stride = self.stride
+        indexes = [k*stride + ys[k]*width + xs[k] for k in ks]
+
+        flags = grid.flags
+        flagged = self.flagged
+        for k, i, shown, was in zip(ks, indexes, _gather(grid.revealed, indexes), _gather(flags, indexes)):
+            if shown:
+                results[k] = 0
+            else:
+                result = -1 if was else 1
+                flags[i] = 1 - was
+                flagged[k] += result
+                results[k] = result
+
+    def click(self, xs, ys):
+        return self.step(['click' if x is not None else None for x in xs], xs, ys)
+
+    def flag(self, xs, ys):
+        return self.step(['flag' if x is not None else None for x in xs], xs, ys)
+
+    def chord(self, xs, ys):
+        return self.step(['chord' if x is not None else None for x in xs], xs, ys)
+
+    #A plane of the stack with the rows between boards taken out
+    def dense(self, plane):
+        stride = self.stride
+        cells = self.cells
+        return b''.join([plane[k*stride:k*stride+cells] for k in range(self.count)])
+
+    #What a player sees on every board, as (visible, revealed, flags) memoryviews shaped (count, height, width)
+    #that numpy.asarray takes without copying. visible holds the numbers 0 to 8 on revealed tiles, CLOSED,
+    #FLAGGED, or BOMB for the bombs shown once a board is lost; revealed and flags are 0/1 masks
+    def observe(self):
+        grid = self.grid
+        size = len(grid.mines)
+        shape = (self.count, self.height, self.width)
+
+        total = (int.from_bytes(grid.counts, 'little') + (int.from_bytes(grid.mines, 'little') << 4) +
+                 int.from_bytes(grid.revealed.translate(_CLOSED_PLANE), 'little') + (int.from_bytes(grid.flags, 'little') << 6))
+        visible = self.dense(total.to_bytes(size, 'little').translate(_VISIBLE))
+
+        return tuple(memoryview(plane).cast('B', shape) for plane in (visible, self.dense(grid.revealed), self.dense(grid.flags)))
+
+    #Board k as a Board of its own, a copy that doesn't follow later moves
+    def board(self, k):
+        grid = self.grid
+        base = k*self.stride
+        end = base + self.cells
+
+        board = Board.from_mines(self.width, self.height, grid.mines[base:end], self.seeds[k])
+        board.bomb_count = self.bomb_count
+        board.bombs_remaining = self.bomb_count - self.flagged[k]
+        board.lazy = self.lazy
+        board.generated = bool(self.generated[k])
+
+        board.revealed = grid.revealed[base:end]
+        board.flags = grid.flags[base:end]
+        board.flagged = self.flagged[k]
+        board.opened = self.opened[k]
+
+        return board
@@ -0,0 +1,526 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from math import log10
+from random import Random, randrange
+
+import batch
+import solver
+import sweeper
+
+#The original one-object-per-cell board, kept here so the array engine has something to be measured against
+class LegacyTile:
+    def __init__(self):
+        self.revealed = False
+        self.flagged = False
+        self.type = 0
+
+class LegacyBomb(LegacyTile):
+    def __init__(self):
+        super(LegacyBomb, self).__init__()
+        self.type = 1
+
+def legacy_gen_board(width, height, bombs):
+    coordinates = [(i, j) for i in range(width) for j in range(height)]
+    board = [[None]*width for _ in range(height)]
+
+    for _ in range(bombs):
+        index = randrange(0, len(coordinates))
+        x, y = coordinates.pop(index)
+        board[y][x] = LegacyBomb()
+
+    for x, y in coordinates:
+        board[y][x] = LegacyTile()
+
+    return board
+
+#The old cell by cell text of Board.__str__
+def legacy_text(board):
+    width = board.width
+    height = board.height
+    text = [[None]*(width+3) for _ in range(height+3)]
+
+    for y in range(height):
+        for x in range(width):
+            if board.is_mine(x, y):
+                text[y+2][x+2] = '$'
+            else:
+                text[y+2][x+2] = str(board.bombs_around(x, y))
+
+    text[0] = '*'.rjust(int(log10(width))+2, ' ')
+    text[1] = text[height+2] = ['*']*(width+4)
+    for y in range(2, height+2):
+        text[y][0] = str(y-2).rjust(int(log10(width))+1, '0')
+        for x in [1, width+2]:
+            text[y][x] = '*'
+
+    return '\n'.join([''.join(text[i]) for i in range(height+3)])
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+#Bytes retained by the object returned from build(), as seen by tracemalloc
+def retained_bytes(build):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    del result
+    return size
+
+def bench_memory(args):
+    print('{:>11} {:>14} {:>14} {:>8}'.format('size', 'objects B/cell', 'arrays B/cell', 'ratio'))
+    for width, height in args.sizes:
+        cells = width*height
+
+        #Bombs cost the same as tiles in either model, and the legacy generator is quadratic in them, so boards are left empty
+        legacy = retained_bytes(lambda: legacy_gen_board(width, height, 0))
+        arrays = retained_bytes(lambda: sweeper.Board(width, height, 0))
+
+        print('{:>11} {:>14.2f} {:>14.2f} {:>7.1f}x'.format(
+            '{}x{}'.format(width, height), legacy/cells, arrays/cells, legacy/arrays))
+
+#First tile with no bombs around it, scanning from the middle of the board so the opened region is a big one
+def find_empty(board):
+    size = board.width*board.height
+    for offset in range(size):
+        i = (size//2 + offset) % size
+        if not board.mines[i] and not board.counts[i]:
+            return i % board.width, i // board.width
+
+def bench_generation(args):
+    print('{:>11} {:>8} {:>10} {:>10} {:>9}'.format('size', 'density', 'legacy s', 'floyd s', 'speedup'))
+    for width, height in args.sizes:
+        for density in args.densities:
+            cells = width*height
+            bombs = int(cells*density)
+
+            start = time.perf_counter()
+            sweeper.Board.gen_board(width, height, bombs, args.seed)
+            floyd = time.perf_counter() - start
+
+            #Every pop shifts the rest of the coordinate list, so past the limit the old generator isn't worth waiting on
+            if cells*bombs > args.legacy_limit:
+                print('{:>11} {:>8} {:>10} {:>10.3f} {:>9}'.format('{}x{}'.format(width, height), density, '-', floyd, '-'))
+                continue
+
+            start = time.perf_counter()
+            legacy_gen_board(width, height, bombs)
+            legacy = time.perf_counter() - start
+
+            print('{:>11} {:>8} {:>10.3f} {:>10.3f} {:>8.1f}x'.format(
+                '{}x{}'.format(width, height), density, legacy, floyd, legacy/floyd))
+
+def bench_cascade(args):
+    print('{:>11} {:>8} {:>12} {:>10} {:>14}'.format('size', 'density', 'revealed', 'seconds', 'cells/second'))
+    for width, height in args.sizes:
+        for density in args.densities:
+            board = sweeper.Board(width, height, int(width*height*density), args.seed)
+            x, y = find_empty(board)
+
+            start = time.perf_counter()
+            board.click(x, y)
+            elapsed = time.perf_counter() - start
+
+            revealed = board.revealed.count(1)
+            print('{:>11} {:>8} {:>12} {:>10.3f} {:>14.0f}'.format(
+                '{}x{}'.format(width, height), density, revealed, elapsed, revealed/elapsed))
+
+def bench_snapshot(args):
+    print('{:>11} {:>10} {:>10} {:>9} {:>9} {:>10} {:>10} {:>10}'.format(
+        'size', 'save KB', 'pickle KB', 'save s', 'load s', 'pickle s', 'unpickle s', 'mmap s'))
+    directory = tempfile.mkdtemp(prefix='pysweeper-')
+    path = os.path.join(directory, 'board.psw')
+    try:
+        for width, height in args.sizes:
+            board = sweeper.Board(width, height, int(width*height*args.density), args.seed, lazy=True)
+            board.click(width//2, height//2)
+
+            start = time.perf_counter()
+            board.save(path)
+            save = time.perf_counter() - start
+
+            start = time.perf_counter()
+            sweeper.Board.load(path)
+            load = time.perf_counter() - start
+
+            start = time.perf_counter()
+            pickled = pickle.dumps(board, pickle.HIGHEST_PROTOCOL)
+            dump = time.perf_counter() - start
+
+            start = time.perf_counter()
+            pickle.loads(pickled)
+            undump = time.perf_counter() - start
+
+            #Opening a snapshot and reading a handful of tiles, which is all an inspection needs
+            start = time.perf_counter()
+            with sweeper.Snapshot(path) as snapshot:
+                for i in range(0, width*height, max(width*height//1000, 1)):
+                    snapshot.is_revealed(i % width, i // width)
+            peek = time.perf_counter() - start
+
+            print('{:>11} {:>10.1f} {:>10.1f} {:>9.4f} {:>9.4f} {:>10.4f} {:>10.4f} {:>10.4f}'.format(
+                '{}x{}'.format(width, height), os.path.getsize(path)/1024, len(pickled)/1024, save, load, dump, undump, peek))
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+        os.rmdir(directory)
+
+def bench_render(args):
+    print('{:>11} {:>10} {:>10} {:>10} {:>8}'.format('size', 'legacy s', 'str s', 'write s', 'speedup'))
+    directory = tempfile.mkdtemp(prefix='pysweeper-')
+    path = os.path.join(directory, 'board.txt')
+    try:
+        for width, height in args.sizes:
+            board = sweeper.Board(width, height, int(width*height*args.density), args.seed)
+
+            start = time.perf_counter()
+            expected = legacy_text(board)
+            legacy = time.perf_counter() - start
+
+            start = time.perf_counter()
+            text = str(board)
+            render = time.perf_counter() - start
+            assert text == expected, "Rendering changed the text"
+
+            start = time.perf_counter()
+            with open(path, 'w') as f:
+                board.write(f, show_all=True)
+            write = time.perf_counter() - start
+
+            print('{:>11} {:>10.4f} {:>10.4f} {:>10.4f} {:>7.1f}x'.format(
+                '{}x{}'.format(width, height), legacy, render, write, legacy/render if render else 0.0))
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+        os.rmdir(directory)
+
+#Launch the game until its first paint, the first run with an empty skin cache. Needs a display
+def bench_startup(args):
+    cache = tempfile.mkdtemp(prefix='pysweeper-skins-')
+    env = dict(os.environ, PYSWEEPER_STARTUP='exit', PYSWEEPER_SKIN_CACHE=cache)
+
+    print('{:>5} {:>6} {:>14} {:>12}'.format('run', 'cache', 'first paint ms', 'process ms'))
+    try:
+        for run in range(args.runs):
+            cold = not os.listdir(cache)
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, 'main.py'], env=env, stdout=subprocess.PIPE, check=True).stdout.decode()
+            process = time.perf_counter() - start
+
+            paint = float(output.split('first paint ')[1].split('ms')[0])
+            print('{:>5} {:>6} {:>14.1f} {:>12.1f}'.format(run, 'cold' if cold else 'warm', paint, 1000*process))
+    finally:
+        shutil.rmtree(cache)
+
+#Board text characters as BoardBatch observation values. Board text has no flag character, so flags are laid over it
+OBSERVED = bytes.maketrans(b'012345678#$', bytes(range(9)) + bytes([batch.CLOSED, batch.BOMB]))
+
+#Play the same random moves on a BoardBatch and on a Board per seed, failing on the first result or plane that differs
+def check_batch(count, width, height, bombs, lazy, steps, rng):
+    seeds = [rng.randrange(1 << 32) for _ in range(count)]
+    boards = batch.BoardBatch(count, width, height, bombs, seeds, lazy)
+    scalar = [sweeper.Board(width, height, bombs, seed, lazy=lazy) for seed in seeds]
+
+    for _ in range(steps):
+        ops = [rng.choice(['click', 'click', 'click', 'flag', 'chord', None]) for _ in range(count)]
+        xs = [rng.randrange(width) for _ in range(count)]
+        ys = [rng.randrange(height) for _ in range(count)]
+
+        expected = []
+        for board, op, x, y in zip(scalar, ops, xs, ys):
+            if op is None:
+                expected.append(None)
+            else:
+                expected.append({'click': board.click, 'flag': board.flag, 'chord': board.auto_click}[op](x, y))
+        assert boards.step(ops, xs, ys) == expected, "BoardBatch results differ from Board"
+
+    for k, board in enumerate(scalar):
+        copy = boards.board(k)
+        for name in ['mines', 'counts', 'revealed', 'flags', 'opened', 'flagged', 'generated']:
+            assert getattr(copy, name) == getattr(board, name), "BoardBatch {} differs from Board".format(name)
+
+    expected = bytearray()
+    for board in scalar:
+        cells = bytearray(board.row_text(0, height).translate(OBSERVED))
+        for i, flagged in enumerate(board.flags):
+            if flagged:
+                cells[i] = batch.FLAGGED
+        expected += cells
+
+    visible, revealed, flags = boards.observe()
+    assert visible.tobytes() == expected, "BoardBatch observation differs from Board"
+    assert revealed.tobytes() == b''.join(board.revealed for board in scalar)
+    assert flags.tobytes() == b''.join(board.flags for board in scalar)
+
+def bench_batch(args):
+    rng = Random(args.seed)
+    checks = 0
+    for width, height, bombs in [(8, 8, 10), (16, 16, 40), (30, 16, 99), (5, 3, 14), (1, 9, 2)]:
+        for lazy in [False, True]:
+            check_batch(8, width, height, bombs, lazy, 200, rng)
+            checks += 1
+    print('BoardBatch matches Board on {} batches of random moves'.format(checks))
+
+    width, height, bombs = PRESETS['expert']
+    seeds = list(range(args.seed, args.seed + args.boards))
+    xs = [[rng.randrange(width) for _ in seeds] for _ in range(args.steps)]
+    ys = [[rng.randrange(height) for _ in seeds] for _ in range(args.steps)]
+
+    print('{:>8} {:>10} {:>10} {:>10}'.format('', 'deal s', 'clicks s', 'observe s'))
+    start = time.perf_counter()
+    scalar = [sweeper.Board(width, height, bombs, seed) for seed in seeds]
+    deal = time.perf_counter() - start
+    start = time.perf_counter()
+    for step in range(args.steps):
+        for k, board in enumerate(scalar):
+            board.click(xs[step][k], ys[step][k])
+    clicks = time.perf_counter() - start
+    start = time.perf_counter()
+    for board in scalar:
+        [board.row_text(0, height), bytes(board.revealed), bytes(board.flags)]
+    observe = time.perf_counter() - start
+    print('{:>8} {:>10.4f} {:>10.4f} {:>10.4f}'.format('Board', deal, clicks, observe))
+
+    start = time.perf_counter()
+    boards = batch.BoardBatch(args.boards, width, height, bombs, seeds)
+    deal = time.perf_counter() - start
+    start = time.perf_counter()
+    for step in range(args.steps):
+        boards.click(xs[step], ys[step])
+    clicks = time.perf_counter() - start
+    start = time.perf_counter()
+    boards.observe()
+    observe = time.perf_counter() - start
+    print('{:>8} {:>10.4f} {:>10.4f} {:>10.4f}'.format('batch', deal, clicks, observe))
+
+PRESETS = {
+    'beginner': (8, 8, 10),
+    'intermediate': (16, 16, 40),
+    'expert': (30, 16, 99),
+    'large': (200, 200, 6000),
+}
+
+def parse_preset(text):
+    if text in PRESETS:
+        return text, PRESETS[text]
+    size, _, mines = text.partition('/')
+    width, height = parse_size(size)
+    return text, (width, height, int(mines))
+
+def bench_solver(args):
+    print('{:>14} {:>7} {:>9} {:>12} {:>12}'.format('board', 'games', 'win rate', 'ms/game', 'ms/win'))
+    for name, (width, height, bombs) in args.boards:
+        wins = 0
+        won_time = 0.0
+        start = time.perf_counter()
+        for seed in range(args.seed, args.seed + args.games):
+            game_start = time.perf_counter()
+            if solver.solve(sweeper.Board(width, height, bombs, seed=seed, lazy=True)):
+                wins += 1
+                won_time += time.perf_counter() - game_start
+        elapsed = time.perf_counter() - start
+
+        print('{:>14} {:>7} {:>8.1%} {:>12.2f} {:>12}'.format(
+            name, args.games, wins/args.games, 1000*elapsed/args.games, '{:.2f}'.format(1000*won_time/wins) if wins else '-'))
+
+#Cases of the regression suite. Each one sets a board up outside the clock and returns the work to be timed
+def case_generation(width, height, bombs, seed):
+    return lambda: sweeper.Board(width, height, bombs, seed)
+
+def case_first_click(width, height, bombs, seed):
+    board = sweeper.Board(width, height, bombs, seed, lazy=True)
+    return lambda: board.click(width//2, height//2)
+
+#Chord up to 1000 of the numbers the first click opened, spread over the region, with all the bombs flagged so each
+#chord opens what is left around it
+def case_chord(width, height, bombs, seed):
+    board = sweeper.Board(width, height, bombs, seed, lazy=True)
+    board.click(width//2, height//2)
+    board.flags = bytearray(board.mines)
+    board.flagged = bombs
+
+    numbers = [i for i, (revealed, count) in enumerate(zip(board.revealed, board.counts)) if revealed and count]
+    numbers = numbers[::max(1, len(numbers)//1000)]
+    def chord():
+        for i in numbers:
+            board.auto_click(i % width, i // width)
+    return chord
+
+def case_solve(width, height, bombs, seed):
+    board = sweeper.Board(width, height, bombs, seed, lazy=True)
+    return lambda: solver.solve(board)
+
+def case_render(width, height, bombs, seed):
+    board = sweeper.Board(width, height, bombs, seed, lazy=True)
+    board.click(width//2, height//2)
+    return lambda: board.display
+
+SUITE = [
+    ('generation', case_generation),
+    ('first_click', case_first_click),
+    ('chord', case_chord),
+    ('solve', case_solve),
+    ('render', case_render),
+]
+
+SUITE_BOARDS = ['beginner', 'intermediate', 'expert'] + [
+    '{0}x{1}/{2}'.format(width, height, int(width*height*density))
+    for width, height in [(100, 100), (500, 500), (2000, 2000)] for density in [0.05, 0.15, 0.2]]
+
+#Best time of a case over the runs. Every run gets a fresh board from the same seed, and small boards are run
+#more often so their times aren't down to timer noise
+def time_case(case, width, height, bombs, seed, repeat):
+    runs = max(repeat, min(200, 20000//(width*height)))
+    best = None
+    for _ in range(runs):
+        work = case(width, height, bombs, seed)
+        start = time.perf_counter()
+        work()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+#The best time of a case in each of several fresh processes, fastest first. A process with an unlucky heap, cache
+#or scheduler slot only ever runs slow, so the fastest sample is the case's time and the rest show how far it strays
+def sample_case(case, width, height, bombs, seed, repeat, samples):
+    times = []
+    for _ in range(samples):
+        with multiprocessing.Pool(1) as pool:
+            times.append(pool.apply(time_case, (case, width, height, bombs, seed, repeat)))
+
+    return sorted(times)
+
+#Time every case on every board and compare with a saved baseline. A case is a regression when its fastest sample is
+#slower than the baseline's fastest by more than the tolerance, and slower than every sample the baseline took, so a
+#baseline that caught one lucky process doesn't fail the next run. Any regression makes the run exit with status 1
+def bench_suite(args):
+    baseline = {}
+    spread = {}
+    if args.compare:
+        with open(args.compare) as f:
+            saved = json.load(f)
+        baseline = saved['results']
+        spread = saved.get('samples', {})
+
+    cases = [(name, case) for name, case in SUITE if not args.cases or name in args.cases]
+    results = {}
+    samples = {}
+    regressions = []
+
+    print('{:>12} {:>16} {:>11} {:>11} {:>8}'.format('case', 'board', 'seconds', 'baseline', 'change'))
+    for board_name, (width, height, bombs) in args.boards:
+        for name, case in cases:
+            if name == 'solve' and width*height > args.solve_limit:
+                continue
+
+            key = '{} {}x{}/{}'.format(name, width, height, bombs)
+            times = samples[key] = sample_case(case, width, height, bombs, args.seed, args.repeat, args.samples)
+            seconds = results[key] = times[0]
+
+            before = baseline.get(key)
+            if before is None:
+                print('{:>12} {:>16} {:>11.6f} {:>11} {:>8}'.format(name, board_name, seconds, '-', '-'))
+                continue
+
+            change = seconds/before - 1 if before else 0.0
+            regressed = change > args.tolerance and seconds > max(spread.get(key, [before]))
+            print('{:>12} {:>16} {:>11.6f} {:>11.6f} {:>+7.0%}{}'.format(name, board_name, seconds, before, change, '  REGRESSION' if regressed else ''))
+            if regressed:
+                regressions.append(key)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'seed': args.seed, 'results': results, 'samples': samples}, f, indent=2, sort_keys=True)
+
+    if regressions:
+        print('{} regression(s) against {}:'.format(len(regressions), args.compare))
+        for key in regressions:
+            print('  ' + key)
+        raise SystemExit(1)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='PySweeper engine benchmarks')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    memory = commands.add_parser('memory', help='bytes per cell of the object model against the array board')
+    memory.add_argument('--sizes', nargs='+', type=parse_size, default=[(8, 8), (30, 16), (100, 100), (500, 500), (1000, 1000)])
+    memory.set_defaults(run=bench_memory)
+
+    generation = commands.add_parser('generation', help='time bomb placement against the old coordinate list generator')
+    generation.add_argument('--sizes', nargs='+', type=parse_size, default=[(8, 8), (30, 16), (100, 100), (500, 500), (1000, 1000), (2000, 2000)])
+    generation.add_argument('--densities', nargs='+', type=float, default=[0.01, 0.15, 0.2, 0.5])
+    generation.add_argument('--seed', type=int, default=0)
+    generation.add_argument('--legacy-limit', type=float, default=1e10, help='skip the old generator when cells*bombs is above this')
+    generation.set_defaults(run=bench_generation)
+
+    cascade = commands.add_parser('cascade', help='time a first click that opens a large empty region')
+    cascade.add_argument('--sizes', nargs='+', type=parse_size, default=[(100, 100), (1000, 1000), (2000, 2000)])
+    cascade.add_argument('--densities', nargs='+', type=float, default=[0.0, 0.01, 0.05])
+    cascade.add_argument('--seed', type=int, default=0)
+    cascade.set_defaults(run=bench_cascade)
+
+    snapshot = commands.add_parser('snapshot', help='binary save and load against pickle')
+    snapshot.add_argument('--sizes', nargs='+', type=parse_size, default=[(30, 16), (500, 500), (2000, 2000)])
+    snapshot.add_argument('--density', type=float, default=0.15)
+    snapshot.add_argument('--seed', type=int, default=0)
+    snapshot.set_defaults(run=bench_snapshot)
+
+    solving = commands.add_parser('solver', help='solve time and win rate of the built in solver')
+    solving.add_argument('--boards', nargs='+', type=parse_preset, default=[parse_preset(name) for name in PRESETS],
+                         help='preset names or WIDTHxHEIGHT/MINES')
+    solving.add_argument('--games', type=int, default=100)
+    solving.add_argument('--seed', type=int, default=0)
+    solving.set_defaults(run=bench_solver)
+
+    render = commands.add_parser('render', help='board text against the old cell by cell rendering')
+    render.add_argument('--sizes', nargs='+', type=parse_size, default=[(30, 16), (500, 500), (2000, 2000)])
+    render.add_argument('--density', type=float, default=0.15)
+    render.add_argument('--seed', type=int, default=0)
+    render.set_defaults(run=bench_render)
+
+    batching = commands.add_parser('batch', help='check BoardBatch against Board and time stepping many boards at once')
+    batching.add_argument('--boards', type=int, default=1000)
+    batching.add_argument('--steps', type=int, default=20)
+    batching.add_argument('--seed', type=int, default=0)
+    batching.set_defaults(run=bench_batch)
+
+    startup = commands.add_parser('startup', help='time from launching the GUI to its first paint')
+    startup.add_argument('--runs', type=int, default=5)
+    startup.set_defaults(run=bench_startup)
+
+    suite = commands.add_parser('suite', help='regression suite over a grid of boards, compared against a saved baseline')
+    suite.add_argument('--boards', nargs='+', type=parse_preset, default=[parse_preset(name) for name in SUITE_BOARDS],
+                       help='preset names or WIDTHxHEIGHT/MINES')
+    suite.add_argument('--cases', nargs='+', choices=[name for name, _ in SUITE], default=None)
+    suite.add_argument('--seed', type=int, default=0)
+    suite.add_argument('--repeat', type=int, default=3, help='runs per case in each process, the best one counts')
+    suite.add_argument('--samples', type=int, default=5, help='processes each case is timed in, the fastest counts')
+    suite.add_argument('--solve-limit', type=int, default=250000, help='skip solving boards with more cells than this')
+    suite.add_argument('--save', default=None, help='write the results to this file as a baseline')
+    suite.add_argument('--compare', default=None, help='baseline file to check the results against')
+    suite.add_argument('--tolerance', type=float, default=0.5, help='allowed slowdown against the baseline, 0.5 is 50%%')
+    suite.set_defaults(run=bench_suite)
+
+    args = parser.parse_args(argv)
+    args.run(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+import os
+import shutil
+import tempfile
+import weakref
+import zlib
+from collections import OrderedDict
+from random import randrange
+
+from sweeper import Board, pack_bits, unpack_bits
+
+#One square piece of an InfiniteBoard, planes are indexed by ly*chunk_size + lx like a Board
+class Chunk:
+    def __init__(self, mines, counts, revealed=None, flags=None):
+        self.mines = mines
+        self.counts = counts
+        self.revealed = revealed if revealed is not None else bytearray(len(mines))
+        self.flags = flags if flags is not None else bytearray(len(mines))
+
+    #Untouched chunks can be dealt again from the seed, so only these need to be written out on eviction
+    @property
+    def touched(self):
+        return 1 in self.revealed or 1 in self.flags
+
+#A field with no edges. It is cut into chunk_size x chunk_size chunks whose bombs are dealt from the board seed and
+#the chunk coordinates, so a chunk is only built once something looks at it and always comes out the same.
+#At most max_chunks stay in memory; the least recently used ones are dropped, or packed to a file in store
+#when the player has revealed or flagged anything in them. Coordinates can be any integers, negative included,
+#and the tiles around (0, 0) never hold a bomb so a game can always be opened there
+class InfiniteBoard:
+    def __init__(self, density=0.15, seed=None, chunk_size=64, max_chunks=1024, store=None, cascade_limit=1000000):
+        assert chunk_size >= 2, "Chunks must be at least 2 tiles wide"
+
+        if seed is None:
+            seed = randrange(1 << 32)
+        self.seed = seed
+
+        self.density = density
+        self.chunk_size = chunk_size
+        self.chunk_bombs = int(chunk_size*chunk_size*density)
+        self.max_chunks = max_chunks
+        self.cascade_limit = cascade_limit
+
+        #Without a store, a temporary one is made on the first eviction that needs it. It is removed by close, or
+        #once the board is garbage collected or the interpreter exits if close is never called
+        if store is not None:
+            os.makedirs(store, exist_ok=True)
+        self.store = store
+        self.temporary = False
+        self.cleanup = None
+
+        self.chunks = OrderedDict()
+        self.flagged = 0
+
+        #(x, y) coordinates of every cell whose revealed or flagged state changed since take_changes was last called
+        self.changed = set()
+
+    def __repr__(self):
+        return 'InfiniteBoard(density={}, seed={}, chunk_size={})'.format(self.density, self.seed, self.chunk_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    #Where a chunk is packed to, None while there is no store yet
+    def chunk_path(self, cx, cy):
+        if self.store is None:
+            return None
+        return os.path.join(self.store, '{}_{}.chunk'.format(cx, cy))
+
+    #Bomb layout of a chunk, which only depends on the seed and the chunk coordinates
+    def chunk_mines(self, cx, cy):
+        chunk = self.chunks.get((cx, cy))
+        if chunk is not None:
+            return chunk.mines
+
+        size = self.chunk_size
+        safe = []
+        for y in range(-1, 2):
+            for x in range(-1, 2):
+                if (x // size, y // size) == (cx, cy):
+                    safe.append((y % size)*size + x % size)
+
+        seed = '{}:{}:{}'.format(self.seed, cx, cy)
+        return Board.gen_board(size, size, min(self.chunk_bombs, size*size - len(safe)), seed, safe)
+
+    #Neighbour counts of a chunk. Its bombs are laid into a grid one tile bigger on every side, with the edges
+    #taken from the surrounding chunks, so tiles on the border count across into the next chunk
+    def chunk_counts(self, cx, cy, mines):
+        size = self.chunk_size
+        padded = size+2
+        grid = bytearray(padded*padded)
+
+        #Which source rows land on which padded rows, and (source column, length, padded column) per offset
+        rows = {-1: [(size-1, 0)], 0: [(r, r+1) for r in range(size)], 1: [(0, size+1)]}
+        cols = {-1: (size-1, 1, 0), 0: (0, size, 1), 1: (0, 1, size+1)}
+
+        for dy in range(-1, 2):
+            for dx in range(-1, 2):
+                source = mines if dx == dy == 0 else self.chunk_mines(cx+dx, cy+dy)
+                start, length, column = cols[dx]
+                for source_row, row in rows[dy]:
+                    grid[row*padded+column:row*padded+column+length] = source[source_row*size+start:source_row*size+start+length]
+
+        padded_counts = Board.count_board(padded, padded, grid)
+        counts = bytearray(size*size)
+        for row in range(size):
+            counts[row*size:(row+1)*size] = padded_counts[(row+1)*padded+1:(row+1)*padded+1+size]
+
+        return counts
+
+    #Fetch a chunk, building it or reading it back from the store if it isn't in memory
+    def chunk(self, cx, cy):
+        key = (cx, cy)
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+            return chunk
+
+        mines = self.chunk_mines(cx, cy)
+        chunk = Chunk(mines, self.chunk_counts(cx, cy, mines))
+
+        path = self.chunk_path(cx, cy)
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = zlib.decompress(f.read())
+            half = len(data)//2
+            chunk.revealed = unpack_bits(data[:half], len(mines))
+            chunk.flags = unpack_bits(data[half:], len(mines))
+
+        self.chunks[key] = chunk
+        return chunk
+
+    #Drop a chunk from memory, packing the player's state in it to disk first if there is any.
+    #A chunk with nothing left in it removes the file of an earlier eviction, so that state can't come back
+    def evict(self, cx, cy):
+        chunk = self.chunks.pop((cx, cy))
+        if chunk.touched:
+            if self.store is None:
+                self.store = tempfile.mkdtemp(prefix='pysweeper-')
+                self.temporary = True
+                self.cleanup = weakref.finalize(self, shutil.rmtree, self.store, ignore_errors=True)
+            with open(self.chunk_path(cx, cy), 'wb') as f:
+                f.write(zlib.compress(pack_bits(chunk.revealed) + pack_bits(chunk.flags)))
+        else:
+            path = self.chunk_path(cx, cy)
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+
+    #Evict least recently used chunks down to max_chunks. Only called once a move is finished, so a chunk
+    #can't be written out while a cascade still holds on to it
+    def trim(self):
+        while len(self.chunks) > self.max_chunks:
+            self.evict(*next(iter(self.chunks)))
+
+    #Write every chunk in memory out to the store
+    def flush(self):
+        for key in list(self.chunks):
+            self.evict(*key)
+
+    #Drop every chunk, and the store too when it was a temporary one. The board can't be used afterwards
+    def close(self):
+        if self.temporary:
+            self.chunks.clear()
+            self.cleanup()
+            self.cleanup = None
+            self.store = None
+            self.temporary = False
+        else:
+            self.flush()
+
+    #Chunk holding a tile and the tile's index inside it
+    def locate(self, x, y):
+        size = self.chunk_size
+        cx, lx = divmod(x, size)
+        cy, ly = divmod(y, size)
+        return self.chunk(cx, cy), ly*size + lx
+
+    def is_mine(self, x, y):
+        chunk, i = self.locate(x, y)
+        return chunk.mines[i] == 1
+
+    def is_revealed(self, x, y):
+        chunk, i = self.locate(x, y)
+        return chunk.revealed[i] == 1
+
+    def is_flagged(self, x, y):
+        chunk, i = self.locate(x, y)
+        return chunk.flags[i] == 1
+
+    #Yield the coordinates surrounding a tile
+    def neighbours(self, x, y):
+        for ny in range(y-1, y+2):
+            for nx in range(x-1, x+2):
+                if nx != x or ny != y:
+                    yield nx, ny
+
+    def bombs_around(self, x, y):
+        chunk, i = self.locate(x, y)
+        return chunk.counts[i]
+
+    def flags_around(self, x, y):
+        return sum(self.is_flagged(nx, ny) for nx, ny in self.neighbours(x, y))
+
+    #Left click a tile, returns 1 if a bomb went off, 0 if it was safe and None if the tile is flagged.
+    #There is no end to the field, so losing only reveals the bomb that was hit
+    def click(self, x, y):
+        chunk, i = self.locate(x, y)
+        if chunk.flags[i]:
+            return None
+
+        if not chunk.revealed[i]:
+            chunk.revealed[i] = 1
+            self.changed.add((x, y))
+
+        if chunk.mines[i]:
+            result = 1
+        else:
+            if not chunk.counts[i]:
+                self.changed.update(self.cascade(x, y))
+            result = 0
+
+        self.trim()
+        return result
+
+    #Right click a tile, toggles the flagged state of unrevealed tiles
+    def flag(self, x, y):
+        chunk, i = self.locate(x, y)
+        if chunk.revealed[i]:
+            return 0
+
+        if chunk.flags[i]:
+            chunk.flags[i] = 0
+            result = -1
+        else:
+            chunk.flags[i] = 1
+            result = 1
+
+        self.flagged += result
+        self.changed.add((x, y))
+        self.trim()
+
+        return result
+
+    #middle click
+    def auto_click(self, x, y):
+        results = []
+        if self.is_revealed(x, y) and self.flags_around(x, y) == self.bombs_around(x, y):
+            for nx, ny in list(self.neighbours(x, y)):
+                results.append(self.click(nx, ny))
+
+        return any(results)
+
+    #Open the region around a tile with no bombs next to it, following it across chunk borders.
+    #A sparse enough field has empty regions that never end, so at most cascade_limit tiles are opened per call;
+    #empty tiles left on the edge stay revealed and clicking one carries on from there.
+    #Returns the set of (x, y) coordinates that were revealed
+    def cascade(self, x, y):
+        limit = self.cascade_limit
+        locate = self.locate
+
+        opened = set()
+        stack = [(x, y)]
+        while stack and len(opened) < limit:
+            cx, cy = stack.pop()
+            for ny in range(cy-1, cy+2):
+                for nx in range(cx-1, cx+2):
+                    chunk, i = locate(nx, ny)
+                    if not chunk.revealed[i] and not chunk.flags[i] and not chunk.mines[i]:
+                        chunk.revealed[i] = 1
+                        opened.add((nx, ny))
+                        if not chunk.counts[i]:
+                            stack.append((nx, ny))
+
+        return opened
+
+    #Hand back the (x, y) coordinates of the cells changed since the last call and start a new batch
+    def take_changes(self):
+        changed = list(self.changed)
+        self.changed = set()
+
+        return changed
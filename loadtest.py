@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+import time
+from random import Random
+
+import server
+
+#One connection to the server. Sessions share connections and tell their answers apart by request id
+class Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.pending = {}
+        self.next_id = 0
+        self.latencies = []
+        self.listener = asyncio.ensure_future(self.listen())
+
+    @classmethod
+    async def open(cls, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def listen(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            self.pending.pop(response['id']).set_result(response)
+
+        for future in self.pending.values():
+            future.set_exception(ConnectionError('Server closed the connection'))
+
+    async def request(self, **fields):
+        self.next_id += 1
+        fields['id'] = self.next_id
+        future = self.pending[self.next_id] = asyncio.get_running_loop().create_future()
+
+        start = time.perf_counter()
+        self.writer.write(json.dumps(fields, separators=(',', ':')).encode() + b'\n')
+        response = await future
+        self.latencies.append(time.perf_counter() - start)
+
+        if not response['ok']:
+            raise RuntimeError(response['error'])
+        return response
+
+    def close(self):
+        self.listener.cancel()
+        self.writer.close()
+
+#Play games back to back until the deadline, clicking closed tiles at random and learning what opened from the diffs.
+#Returns (games, wins)
+async def player(connection, rng, width, height, mines, deadline, think):
+    games = wins = 0
+    while time.monotonic() < deadline:
+        session = (await connection.request(op='new', width=width, height=height, mines=mines, seed=rng.randrange(1 << 32)))['session']
+        closed = list(range(width*height))
+        opened = set()
+        state = 'playing'
+
+        while state == 'playing' and time.monotonic() < deadline:
+            while True:
+                pick = rng.randrange(len(closed))
+                i = closed[pick]
+                if i not in opened:
+                    break
+                closed[pick] = closed[-1]
+                closed.pop()
+
+            response = await connection.request(op='click', session=session, x=i % width, y=i // width)
+            state = response['state']
+            for x, y, cell in response['changed']:
+                if cell != '#':
+                    opened.add(y*width + x)
+
+            if think:
+                await asyncio.sleep(think)
+
+        await connection.request(op='close', session=session)
+        if state != 'playing':
+            games += 1
+            wins += state == 'won'
+
+    return games, wins
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered)-1, int(len(ordered)*fraction))]
+
+async def load(host, port, sessions, connections, seconds, width, height, mines, think, seed):
+    pool = [await Connection.open(host, port) for _ in range(connections)]
+    before = await pool[0].request(op='stats')
+
+    start = time.perf_counter()
+    deadline = time.monotonic() + seconds
+    rng = Random(seed)
+    results = await asyncio.gather(*[player(pool[n % connections], Random(rng.randrange(1 << 32)), width, height, mines, deadline, think)
+                                     for n in range(sessions)])
+    wall = time.perf_counter() - start
+
+    after = await pool[0].request(op='stats')
+    latencies = sorted(latency for connection in pool for latency in connection.latencies)
+    for connection in pool:
+        connection.close()
+
+    requests = after['requests'] - before['requests'] - 1
+    cpu = after['cpu'] - before['cpu']
+    games = sum(games for games, _ in results)
+    wins = sum(wins for _, wins in results)
+
+    print('{} sessions over {} connections for {:.1f}s, {} games ({} won)'.format(sessions, connections, wall, games, wins))
+    print('{} requests, {:.0f}/s, latency p50 {:.2f}ms p99 {:.2f}ms max {:.2f}ms'.format(
+        requests, requests/wall, 1000*percentile(latencies, 0.5), 1000*percentile(latencies, 0.99), 1000*latencies[-1]))
+    if cpu > 0:
+        #How many sessions playing at this pace one fully busy core could keep up with
+        print('server used {:.2f} cores, {:.0f} requests per CPU second, {:.0f} sessions per core'.format(
+            cpu/wall, requests/cpu, sessions*wall/cpu))
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+def serve_local(port, ready):
+    server.run(port=port, ready=ready.set)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test a PySweeper server')
+    parser.add_argument('--connect', default=None, help='HOST:PORT of a running server, otherwise one is started locally')
+    parser.add_argument('--port', type=int, default=8766, help='port for the local server')
+    parser.add_argument('--sessions', type=int, default=1000, help='games played at once')
+    parser.add_argument('--connections', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--size', type=parse_size, default=(30, 16), help='board size as WIDTHxHEIGHT')
+    parser.add_argument('--mines', type=int, default=99)
+    parser.add_argument('--think', type=float, default=0.0, help='seconds each player waits between clicks')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    process = None
+    if args.connect:
+        host, _, port = args.connect.rpartition(':')
+        port = int(port)
+    else:
+        host, port = '127.0.0.1', args.port
+        ready = multiprocessing.Event()
+        process = multiprocessing.Process(target=serve_local, args=(port, ready), daemon=True)
+        process.start()
+        if not ready.wait(10):
+            print('Local server did not start', file=sys.stderr)
+            return 1
+
+    try:
+        width, height = args.size
+        asyncio.run(load(host, port, args.sessions, min(args.connections, args.sessions), args.seconds,
+                         width, height, args.mines, args.think, args.seed))
+    finally:
+        if process is not None:
+            process.terminate()
+
+if __name__ == '__main__':
+    sys.exit(main())
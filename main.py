@@ -1,9 +1,16 @@
-from tkinter import *
-from PIL import Image
+import time
+STARTED = time.perf_counter()
 
+from tkinter import Tk, Canvas, Menu, Scrollbar, IntVar, HORIZONTAL, VERTICAL, NW, EW, NS, UNITS
+
+import os
 import sweeper
+import replay
+import skins
 import configparser
-import ImageTk as IMTK
+
+MODE_NAMES = ['Beginner', 'Intermediate', 'Expert']
+DEFAULT_SKIN = 'cloneskin.bmp'
 
 class App(Tk):
     def __init__(self, *args, **kwargs):
@@ -34,21 +41,46 @@ class App(Tk):
             self.tile_height = tile_height = int(config_file['custom']['height'])
             self.mines = mines = int(config_file['custom']['mines'])
 
-        self.board = sweeper.Board(tile_width, tile_height, mines)
+        self.no_guess = IntVar()
+        self.no_guess.set(int(config_file['config'].get('no_guess', '0')))
+        self.board_pool = None
+        self.board = self.deal()
+
+        self.canvas = canvas = Canvas(self, highlightthickness=0)
+
+        #The tiles live on their own canvas sitting inside the frame, which scrolls over the board and only holds
+        #items for the tiles in view
+        self.field_canvas = field_canvas = Canvas(canvas, highlightthickness=0, borderwidth=0)
+        self.h_scroll = Scrollbar(self, orient=HORIZONTAL, command=field_canvas.xview)
+        self.v_scroll = Scrollbar(self, orient=VERTICAL, command=field_canvas.yview)
+        field_canvas.configure(xscrollcommand=self.x_scrolled, yscrollcommand=self.y_scrolled, xscrollincrement=16, yscrollincrement=16)
 
-        self.canvas = canvas = Canvas(self)
-        self.canvas.bind('<ButtonPress-1>', self.left_press)
-        self.canvas.bind('<ButtonPress-2>', self.middle_press)
-        self.canvas.bind('<ButtonPress-3>', self.right_press)
+        self.field_canvas.bind('<ButtonPress-1>', self.left_press)
+        self.field_canvas.bind('<ButtonPress-2>', self.middle_press)
+        self.field_canvas.bind('<ButtonPress-3>', self.right_press)
         
-        self.canvas.bind('<ButtonRelease-1>', self.left_release)
-        self.canvas.bind('<ButtonRelease-2>', self.middle_release)
-        self.canvas.bind('<ButtonRelease-3>', self.right_release)
+        self.field_canvas.bind('<ButtonRelease-1>', self.left_release)
+        self.field_canvas.bind('<ButtonRelease-2>', self.middle_release)
+        self.field_canvas.bind('<ButtonRelease-3>', self.right_release)
+
+        self.field_canvas.bind('<MouseWheel>', self.wheel_scroll)
+        self.field_canvas.bind('<Shift-MouseWheel>', self.wheel_scroll)
+        self.field_canvas.bind('<Button-4>', self.wheel_scroll)
+        self.field_canvas.bind('<Button-5>', self.wheel_scroll)
+        self.field_canvas.bind('<Shift-Button-4>', self.wheel_scroll)
+        self.field_canvas.bind('<Shift-Button-5>', self.wheel_scroll)
+
+        #Tiles kept drawn past each edge of the view, so small scrolls don't expose unfilled space
+        self.view_margin = 2
+        self.view_pending = False
+        self.exploded = None
         
+        #Skin path -> skins.Skin
+        self.skins = {}
         self.load_bitmap()
         self.add_menubar()
         self.create_gui()
-        self.canvas.pack()
+        self.canvas.grid(row=0, column=0)
         self.running = True
         
     def add_menubar(self):
@@ -65,6 +97,7 @@ class App(Tk):
         self.game_menu.add_radiobutton(label="Intermediate", variable=self.mode, value=1, command=self.reload)
         self.game_menu.add_radiobutton(label="Expert", variable=self.mode, value=2, command=self.reload)
         self.game_menu.add_radiobutton(label="Custom...", variable=self.mode, value=3, command=self.set_custom)
+        self.game_menu.add_checkbutton(label="No Guessing", variable=self.no_guess, command=self.toggle_no_guess)
 
         self.game_menu.add_separator()
 
@@ -74,6 +107,7 @@ class App(Tk):
         
         self.game_menu.add_radiobutton(label="Marks (?)", variable=self.marks_check, value=1, command=self.toggle_marks)
         self.game_menu.add_command(label="Best Times...", command=self.show_times)
+        self.game_menu.add_command(label="Skin...", command=self.choose_skin)
 
         self.game_menu.add_separator()
 
@@ -83,175 +117,250 @@ class App(Tk):
         #Add menu bar to window
         self.config(menu=self.menubar)
 
+    #Sprites come from the skin's atlas in the skin cache, which is only built the first time a skin is seen.
+    #Skins stay loaded once used, so switching back to one doesn't touch the disk again
+    def load_skin(self, path):
+        skin = self.skins.get(path)
+        if skin is None:
+            skin = self.skins[path] = skins.Skin(self, path)
+        return skin
+
+    #A configured skin that has gone missing or can't be read falls back to the default one, rather than stopping
+    #the game from starting
     def load_bitmap(self):
-        self.PIL_image = im = Image.open("cloneskin.bmp")
-        
-#Rows of tiles
-        self.revealed = [IMTK.PhotoImage(im.crop(((16*i), 0, (16*i)+16, 16))) for i in range(9)]
-        self.tiles = [IMTK.PhotoImage(im.crop(((16*i), 16, (16*i)+16, 32))) for i in range(8)]
-        self.numbers = [IMTK.PhotoImage(im.crop(((12*i), 33, (12*i)+11, 54))) for i in range(11)]
-        self.faces = [IMTK.PhotoImage(im.crop(((27*i), 55, (27*i)+25, 81))) for i in range(5)]
-        
-        self.display_field = IMTK.PhotoImage(im.crop((28, 82, 69, 107)))
-        self.blank_space = IMTK.PhotoImage(im.crop((0, 0, 14, 14)))
-#Frame pieces
-        self.top_left = IMTK.PhotoImage(im.crop((0, 82, 12, 93)))
-        self.top_right = IMTK.PhotoImage(im.crop((15, 82, 27, 93)))
+        path = self.config_file['config'].get('skin', DEFAULT_SKIN)
+        try:
+            skin = self.load_skin(path)
+        except (ValueError, OSError):
+            skin = self.load_skin(DEFAULT_SKIN)
+        self.skin = skin
+
+        self.revealed = skin.revealed
+        self.tiles = skin.tiles
+        self.numbers = skin.numbers
+        self.faces = skin.faces
+        for name, _ in skins.FRAME_PIECES:
+            setattr(self, name, skin.pieces[name])
+
+    #Switch to another skin bitmap and redraw the window with it. The skin is only saved to the config once it has
+    #loaded, so a bitmap that can't be used never ends up there
+    def set_skin(self, path):
+        try:
+            self.load_skin(path)
+        except (ValueError, OSError) as e:
+            from tkinter import messagebox
+            messagebox.showerror('Skin', 'Could not load {}: {}'.format(path, e))
+            return
 
-        self.middle_left = IMTK.PhotoImage(im.crop((0, 96, 12, 107)))
-        self.middle_right = IMTK.PhotoImage(im.crop((15, 96, 27, 107)))
+        self.config_file['config']['skin'] = path
+        with open('config.ini', 'w') as f:
+            self.config_file.write(f)
 
-        self.bottom_left = IMTK.PhotoImage(im.crop((0, 110, 11, 122)))
-        self.bottom_right = IMTK.PhotoImage(im.crop((15, 110, 27, 122)))
+        self.load_bitmap()
+        self.canvas.delete("all")
+        self.create_gui()
 
-        self.top_slice = IMTK.PhotoImage(im.crop((13, 82, 14, 93)))
-        
-        self.upper_left_slice = IMTK.PhotoImage(im.crop((0, 94, 12, 95)))
-        self.upper_right_slice = IMTK.PhotoImage(im.crop((15, 94, 27, 95)))
-        
-        self.middle_slice = IMTK.PhotoImage(im.crop((13, 96, 14, 107)))
-        
-        self.lower_left_slice = IMTK.PhotoImage(im.crop((0, 108, 12, 109)))
-        self.lower_right_slice = IMTK.PhotoImage(im.crop((15, 108, 27, 109)))
-        
-        self.bottom_slice = IMTK.PhotoImage(im.crop((13, 110, 14, 122)))
+    def choose_skin(self):
+        from tkinter import filedialog
+
+        path = filedialog.askopenfilename(title='Skin', filetypes=[('Bitmaps', '*.bmp')])
+        if path:
+            self.set_skin(path)
 
     def create_gui(self):
-        #Based on tile values, calculate and set window size
-        self.width = 23 + 16*self.tile_width
-        self.height = 66 + 16*self.tile_height
+        #Based on tile values, calculate and set window size. Boards bigger than the screen get a scrolling view
+        #of as many tiles as fit, so the window and the number of canvas items stop growing with the board
+        self.view_width = min(self.tile_width, max(8, (self.winfo_screenwidth()-80)//16))
+        self.view_height = min(self.tile_height, max(8, (self.winfo_screenheight()-160)//16))
+        self.width = 23 + 16*self.view_width
+        self.height = 66 + 16*self.view_height
         
-        self.geometry("{}x{}".format(self.width, self.height))
         self.canvas.configure(width=self.width, height=self.height)
 
+        if self.view_width < self.tile_width:
+            self.h_scroll.grid(row=1, column=0, sticky=EW)
+        else:
+            self.h_scroll.grid_remove()
+        if self.view_height < self.tile_height:
+            self.v_scroll.grid(row=0, column=1, sticky=NS)
+        else:
+            self.v_scroll.grid_remove()
+        self.geometry('')
+
         self.create_frame(self.canvas)
         self.create_field(self.canvas)
 
+    #The border and the header strip are drawn as a single image, built once for each window size
     def create_frame(self, canvas):
-        canvas.create_image((0, 0), image=self.top_left, tag=('frame'), anchor=NW)
-        canvas.create_image((self.width, 0), image=self.top_right, tag=('frame'), anchor=NE)
-        canvas.create_image((0, self.height), image=self.bottom_left, tag=('frame'), anchor=SW)
-        canvas.create_image((self.width, self.height), image=self.bottom_right, tag=('frame'), anchor=SE)
-
-        canvas.create_image((0, self.top_left.height()+33), image=self.middle_left, tag=('frame'), anchor=NW)
-        canvas.create_image((self.width, 33+self.top_left.height()), image=self.middle_right, tag=('frame'), anchor=NE)
-
-        for i in range(self.width-self.bottom_right.width()-self.bottom_left.width()):
-            canvas.create_image((i + self.bottom_left.width(), self.height), image=self.bottom_slice, tag=('frame'), anchor=SW)
-            canvas.create_image((i + self.top_left.width(), 0), image=self.top_slice, tag=('frame'), anchor=NW)
-            canvas.create_image((i + self.middle_left.width(), self.top_left.height()+33), image=self.middle_slice, tag=('frame'), anchor=NW)
-            
-        for i in range(33):
-            canvas.create_image((0, i+self.top_left.height()), image=self.upper_left_slice, tag=('frame'), anchor=NW)
-            canvas.create_image((self.width, i+self.top_left.height()), image=self.upper_right_slice, tag=('frame'), anchor=NE)
-        for i in range(self.height-self.top_left.height()-33-self.middle_left.height()-self.bottom_left.height()):
-            canvas.create_image((0, i+self.top_left.height()+33+self.middle_left.height()), image=self.lower_left_slice, anchor=NW)
-            canvas.create_image((self.width, i+self.top_left.height()+33+self.middle_left.height()), image=self.lower_right_slice, anchor=NE)
-    
+        canvas.create_image((0, 0), image=self.skin.frame(self.width, self.height), tag=('frame'), anchor=NW)
+
     def create_field(self, canvas):
         self.draw_tiles(canvas)
-
-        for i in [0, 14, 19]:
-            for j in range(self.upper_left_slice.width(), self.width-self.upper_right_slice.width()-13):
-                canvas.create_image((j, self.top_slice.height()+i), image=self.blank_space, tag=('frame'), anchor=NW)
-        
-        canvas.create_image((self.upper_left_slice.width()+5, self.top_slice.height()+4), image=self.display_field, tag=('frame'), anchor=NW)
-        canvas.create_image((self.width-self.upper_right_slice.width()-5, self.top_slice.height()+4), image=self.display_field, tag=('frame'), anchor=NE)
         canvas.create_image((self.width//2, 28), image=self.faces[0], tag=('face'))
 
     def draw_tiles(self, canvas):
         self.starting_x = self.lower_left_slice.width()
         self.starting_y = self.top_slice.height()+33+self.middle_slice.height()
+
+        field_canvas = self.field_canvas
+        field_canvas.delete('all')
+        field_canvas.configure(width=16*self.view_width, height=16*self.view_height,
+                               scrollregion=(0, 0, 16*self.tile_width, 16*self.tile_height))
+        field_canvas.xview_moveto(0)
+        field_canvas.yview_moveto(0)
+        canvas.create_window((self.starting_x, self.starting_y), window=field_canvas, anchor=NW, tag=('field'))
+
+        #(row, col) -> canvas item for the tiles currently drawn, and items scrolled out of view waiting to be reused
         self.field = {}
-        
-        for row in range(0, self.tile_height):
-            for col in range(0, self.tile_width):
-                x = self.starting_x+self.tiles[0].width()*col
-                y = self.starting_y+self.tiles[0].height()*row
-                cell = self.board.board[row][col]
-                
-                if cell.flagged:
-                    cur_image = self.tiles[3]
-                elif cell.revealed:
-                    if cell.type:
-                        cur_image = self.tiles[2]
-                    else:
-                        cur_image = self.revealed[self.board.bombs_around(col, row)]
+        self.spare = []
+        self.refresh_view()
+
+        #Everything is drawn, so anything the board had queued up is already on screen
+        self.board.take_changes()
+
+    #Bring the drawn tiles in line with the scrolled position. Items for tiles that left the view are moved over to
+    #the tiles that entered it, so the canvas only ever holds about a screenful of items
+    def refresh_view(self):
+        self.view_pending = False
+        field_canvas = self.field_canvas
+        tile_w = self.tiles[0].width()
+        tile_h = self.tiles[0].height()
+
+        left = max(int(field_canvas.canvasx(0))//tile_w - self.view_margin, 0)
+        top = max(int(field_canvas.canvasy(0))//tile_h - self.view_margin, 0)
+        right = min(left + self.view_width + 2*self.view_margin + 1, self.tile_width)
+        bottom = min(top + self.view_height + 2*self.view_margin + 1, self.tile_height)
+
+        field = self.field
+        for row, col in list(field):
+            if not (top <= row < bottom and left <= col < right):
+                self.spare.append(field.pop((row, col)))
+
+        for row in range(top, bottom):
+            for col in range(left, right):
+                if (row, col) in field:
+                    continue
+
+                x = tile_w*col
+                y = tile_h*row
+                if self.spare:
+                    item = self.spare.pop()
+                    field_canvas.coords(item, x, y)
+                    field_canvas.itemconfigure(item, image=self.tile_image(col, row))
                 else:
-                    cur_image = self.tiles[0]
-                
-                self.field[row, col] = canvas.create_image((x, y), image=cur_image, tag=('tile', 'row={}'.format(row), 'col={}'.format(col)), anchor=NW)
+                    item = field_canvas.create_image((x, y), image=self.tile_image(col, row), tag=('tile'), anchor=NW)
+                field[row, col] = item
+
+    #Scrolling reports come in bursts, so the view is refreshed once things settle
+    def schedule_refresh(self):
+        if not self.view_pending:
+            self.view_pending = True
+            self.after_idle(self.refresh_view)
+
+    def x_scrolled(self, first, last):
+        self.h_scroll.set(first, last)
+        self.schedule_refresh()
+
+    def y_scrolled(self, first, last):
+        self.v_scroll.set(first, last)
+        self.schedule_refresh()
+
+    def wheel_scroll(self, event):
+        if event.num == 4 or event.delta > 0:
+            step = -1
+        else:
+            step = 1
+
+        if event.state & 0x1:
+            self.field_canvas.xview_scroll(step, UNITS)
+        else:
+            self.field_canvas.yview_scroll(step, UNITS)
+
+    #Pick the sprite matching the current state of a tile
+    def tile_image(self, col, row):
+        if self.board.is_flagged(col, row):
+            return self.tiles[3]
+        elif self.board.is_revealed(col, row):
+            if self.board.is_mine(col, row):
+                if (col, row) == self.exploded:
+                    return self.tiles[5]
+                return self.tiles[2]
+            else:
+                return self.revealed[self.board.bombs_around(col, row)]
+        else:
+            return self.tiles[0]
 
+    #Swap the image on the existing canvas items of tiles the board reports as changed, rather than redrawing the field.
+    #Tiles out of view have no item and get the right image when they are scrolled to
+    def update_tiles(self, canvas):
+        field = self.field
+        for col, row in self.board.take_changes():
+            if (row, col) in field:
+                self.field_canvas.itemconfigure(field[row, col], image=self.tile_image(col, row))
 
+    #Turn coordinates of an event on the field canvas into a tile, or None if they fall off the board
     def to_tile_space(self, coordinates):
         assert len(coordinates)==2, "coordinates must be passed in a tuple of form (x, y)"
         x, y = coordinates
 
-        return ((x-self.lower_left_slice.width())//self.tiles[0].width(), (y-(self.top_slice.height()+33+self.middle_slice.height()))//self.tiles[0].height())
+        col = int(self.field_canvas.canvasx(x))//self.tiles[0].width()
+        row = int(self.field_canvas.canvasy(y))//self.tiles[0].height()
+        if 0 <= col < self.tile_width and 0 <= row < self.tile_height:
+            return col, row
 
     def left_press(self, event):
-        if (self.starting_x > event.x or event.x > self.width-self.lower_right_slice.width() or self.starting_y > event.y or event.y > self.height-self.bottom_slice.height() or not self.running):
+        if (not self.running or self.to_tile_space((event.x, event.y)) is None):
             return
     def middle_press(self, event):
-        if (self.starting_x > event.x or event.x > self.width-self.lower_right_slice.width() or self.starting_y > event.y or event.y > self.height-self.bottom_slice.height() or not self.running):
+        if (not self.running or self.to_tile_space((event.x, event.y)) is None):
             return
     def right_press(self, event):
-        if (self.starting_x > event.x or event.x > self.width-self.lower_right_slice.width() or self.starting_y > event.y or event.y > self.height-self.bottom_slice.height() or not self.running):
+        if (not self.running or self.to_tile_space((event.x, event.y)) is None):
             return
 
     def left_release(self, event):
-        if (self.starting_x > event.x or event.x > self.width-self.lower_right_slice.width() or self.starting_y > event.y or event.y > self.height-self.bottom_slice.height() or not self.running):
+        tile = self.to_tile_space((event.x, event.y))
+        if (not self.running or tile is None):
             return
         
-        x, y = self.to_tile_space((event.x, event.y))
+        x, y = tile
         result = self.board.click(x, y)
-        self.canvas.delete("tile")
-        self.draw_tiles(self.canvas)
         if result:
-            abs_x = self.starting_x+self.tiles[0].width()*x
-            abs_y = self.starting_y+self.tiles[0].height()*y
-            self.field[y, x] = self.canvas.create_image((abs_x, abs_y), image=self.tiles[5], tag=('tile', 'row={}'.format(y), 'col={}'.format(x)), anchor=NW)
+            self.exploded = (x, y)
             self.running = False
+        elif self.board.won:
+            self.win()
+        self.update_tiles(self.canvas)
 
         return result
         
     def middle_release(self, event):
-        if (self.starting_x > event.x or event.x > self.width-self.lower_right_slice.width() or self.starting_y > event.y or event.y > self.height-self.bottom_slice.height() or not self.running):
+        tile = self.to_tile_space((event.x, event.y))
+        if (not self.running or tile is None):
             return
         
-        x, y = self.to_tile_space((event.x, event.y))
+        x, y = tile
         result = self.board.auto_click(x, y)
-        self.canvas.delete("tile")
-        self.draw_tiles(self.canvas)
+        self.update_tiles(self.canvas)
 
         if result:
             self.running = False
+        elif self.board.won:
+            self.win()
 
         return result
         
         
     def right_release(self, event):
-        if (self.starting_x > event.x or event.x > self.width-self.lower_right_slice.width() or self.starting_y > event.y or event.y > self.height-self.bottom_slice.height() or not self.running):
+        tile = self.to_tile_space((event.x, event.y))
+        if (not self.running or tile is None):
             return
         
-        x, y = self.to_tile_space((event.x, event.y))
-        abs_x = self.starting_x+self.tiles[0].width()*x
-        abs_y = self.starting_y+self.tiles[0].height()*y
-
+        x, y = tile
         result = self.board.flag(x, y)
-        
-        if result == -1:
-            self.canvas.delete(self.field[y, x])
-            cur_image = self.tiles[0]
+        self.update_tiles(self.canvas)
 
-            self.field[y, x] = self.canvas.create_image((abs_x, abs_y), image=cur_image, tag=('tile', 'row={}'.format(y), 'col={}'.format(x)), anchor=NW)
-
-        elif result == 1:
-            self.canvas.delete(self.field[y, x])
-            cur_image = self.tiles[3]
-            
-            self.field[y, x] = self.canvas.create_image((abs_x, abs_y), image=cur_image, tag=('tile', 'row={}'.format(y), 'col={}'.format(x)), anchor=NW)
-        
+        return result
 
     def reload(self):
         self.config_file['config']['mode'] = str(self.mode.get())
@@ -280,9 +389,34 @@ class App(Tk):
 
 #-----------Game Menu Methods-----------
 
+    #New board for the current settings. No guess boards come from a pool of worker processes, already opened at the
+    #tile they were made for
+    def deal(self):
+        if not self.no_guess.get():
+            board = sweeper.Board(self.tile_width, self.tile_height, self.mines, lazy=True)
+            replay.Journal.attach(board)
+            return board
+
+        size = (self.tile_width, self.tile_height, self.mines)
+        pool = self.board_pool
+        if pool is None or (pool.width, pool.height, pool.bombs) != size:
+            if pool is not None:
+                pool.close()
+            #Only no guess games need the worker processes, so their imports wait until then
+            import noguess
+            self.board_pool = pool = noguess.BoardPool(*size)
+
+        #The opening click is the game's, not the player's, so the journal starts from the opened board and its
+        #clock from the player's first move
+        board, (x, y) = pool.take()
+        board.click(x, y)
+        replay.Journal.attach(board)
+        return board
+
     def new(self):
-        self.board = sweeper.Board(self.tile_width, self.tile_height, self.mines)
+        self.board = self.deal()
         self.canvas.delete("all")
+        self.exploded = None
         self.create_gui()
         self.running = True
         
@@ -296,14 +430,93 @@ class App(Tk):
         else:
             self.marks = 1
             self.marks_check.set(1)
+    #Best times are only kept for the standard modes, with no guess boards apart since they start already opened.
+    #A board the pool couldn't make guess free isn't one, so its win counts as an ordinary game's
+    #Each one is saved with the journal of the game that set it, so show_times can replay it and check the time was
+    #really earned
+    def times_key(self, mode, no_guess):
+        return '{}-noguess'.format(mode) if no_guess else str(mode)
+
+    def times_path(self, mode, no_guess):
+        name = MODE_NAMES[mode].lower() + ('-noguess' if no_guess else '')
+        return os.path.join('times', '{}.journal'.format(name))
+
     def show_times(self):
-        pass
+        from tkinter import messagebox
+
+        lines = []
+        for no_guess in [False, True]:
+            for mode, name in enumerate(MODE_NAMES):
+                if no_guess:
+                    name += ' (No Guessing)'
+                path = self.times_path(mode, no_guess)
+                if not os.path.exists(path):
+                    lines.append('{}: no time yet'.format(name))
+                    continue
+
+                seconds = replay.Replay(replay.Journal.load(path)).verify()
+                if seconds is None:
+                    lines.append('{}: journal does not replay to a win'.format(name))
+                else:
+                    lines.append('{}: {:.2f} seconds (verified)'.format(name, seconds))
+
+        messagebox.showinfo('Best Times', '\n'.join(lines))
+
+    def win(self):
+        self.running = False
+
+        mode = self.mode.get()
+        journal = self.board.journal
+        if mode >= len(MODE_NAMES) or journal is None:
+            return
+
+        no_guess = self.board.no_guess
+        key = self.times_key(mode, no_guess)
+        times = self.config_file['times'] if self.config_file.has_section('times') else None
+        if times is not None and key in times and float(times[key]) <= journal.elapsed:
+            return
+
+        os.makedirs('times', exist_ok=True)
+        journal.save(self.times_path(mode, no_guess))
+        if times is None:
+            self.config_file.add_section('times')
+        self.config_file['times'][key] = '{:.3f}'.format(journal.elapsed)
+        with open('config.ini', 'w') as f:
+            self.config_file.write(f)
     
+    def toggle_no_guess(self):
+        self.config_file['config']['no_guess'] = str(self.no_guess.get())
+        with open('config.ini', 'w') as f:
+            self.config_file.write(f)
+
+        self.new()
+
     def exit_game(self):
+        if self.board_pool is not None:
+            self.board_pool.close()
         self.destroy()
 
 #-----------\Game Menu Methods-----------'''
 
 if __name__ == '__main__':
+    #PYSWEEPER_PROFILE=path.json times the game and the GUI, writing the metrics out when the window closes
+    profile_path = os.environ.get('PYSWEEPER_PROFILE')
+    if profile_path:
+        import profiling
+        profiling.enable(App)
+
     app = App()
-    app.mainloop()
+
+    #PYSWEEPER_STARTUP=1 reports the time from launch to the first painted window, PYSWEEPER_STARTUP=exit quits after
+    startup = os.environ.get('PYSWEEPER_STARTUP')
+    if startup:
+        app.update()
+        print('first paint {:.1f}ms'.format(1000*(time.perf_counter() - STARTED)), flush=True)
+
+    if startup == 'exit':
+        app.exit_game()
+    else:
+        app.mainloop()
+
+    if profile_path:
+        profiling.dump(profile_path)
@@ -0,0 +1,124 @@
+import multiprocessing
+from collections import deque
+from random import Random, randrange
+
+from solver import Solver
+from sweeper import Board
+
+#Play a bomb layout from its first click using logic only. Returns None if that clears the board,
+#otherwise the solver as it stood when it got stuck
+def clear(width, height, mines, x, y):
+    board = Board.from_mines(width, height, mines, seed=0)
+    solver = Solver(board)
+    board.click(x, y)
+
+    while not board.won:
+        move = solver.safe_move()
+        if move is None:
+            return solver
+        #Nothing on this board is flagged, so every safe move is a click
+        board.click(move[1], move[2])
+
+#Move one bomb from the closed tiles the solver got stuck on to a closed tile away from everything it has seen.
+#Bombs the solver hadn't pinned down are moved first. Returns False if there is nothing to move or nowhere to put it
+def relocate(mines, solver, safe, rng):
+    revealed = solver.board.revealed
+
+    stuck = set()
+    for i in solver.frontier:
+        for n in solver.around(i):
+            if not revealed[n]:
+                stuck.add(n)
+
+    sources = sorted(n for n in stuck if mines[n] and n not in solver.mines) or sorted(n for n in stuck if mines[n])
+    if not sources:
+        return False
+
+    protected = set(safe)
+    def open_spot(i):
+        return not mines[i] and not revealed[i] and i not in stuck and i not in protected
+
+    size = len(mines)
+    for _ in range(64):
+        target = rng.randrange(size)
+        if open_spot(target):
+            break
+    else:
+        spots = [i for i in range(size) if open_spot(i)]
+        if not spots:
+            return False
+        target = rng.choice(spots)
+
+    mines[rng.choice(sources)] = 0
+    mines[target] = 1
+    return True
+
+#Lay out bombs that the solver can clear from a first click at (x, y) without guessing.
+#Rather than throwing away every layout that needs a guess, a layout is repaired: each time the solver gets stuck,
+#a bomb is moved off the tiles it is stuck on and the layout is played again. A layout that runs out of repairs is
+#replaced by a fresh one, up to restarts times. Returns (mines, solved); solved is False if every attempt ran out,
+#which only happens on very dense boards, and the last layout tried is returned anyway
+def generate(width, height, bombs, x, y, seed=None, restarts=10, repairs=None):
+    rng = Random(seed)
+    safe = Board(width, height, bombs, seed=0, lazy=True).safe_cells(x, y)
+    if repairs is None:
+        repairs = max(50, bombs)
+
+    mines = None
+    for _ in range(restarts):
+        mines = Board.gen_board(width, height, bombs, rng.randrange(1 << 32), safe)
+        for _ in range(repairs):
+            solver = clear(width, height, mines, x, y)
+            if solver is None:
+                return mines, True
+            if not relocate(mines, solver, safe, rng):
+                break
+
+    return mines, False
+
+#Keeps no guess boards coming from worker processes so a new game doesn't wait on generation. Each board waiting
+#in the pool gets a worker of its own, up to one per CPU, so they are generated side by side. A pool starts empty,
+#so the first take after one is made waits for the first layout to be finished.
+#Layouts are made for a random start tile, which take hands back along with the board so it can be opened for the player.
+#Boards come back with no_guess False when no layout without guesses was found
+class BoardPool:
+    def __init__(self, width, height, bombs, size=4, processes=None):
+        self.width = width
+        self.height = height
+        self.bombs = bombs
+        self.size = size
+
+        if processes is None:
+            processes = min(size, multiprocessing.cpu_count())
+        self.workers = multiprocessing.Pool(processes)
+        self.pending = deque()
+        self.fill()
+
+    def fill(self):
+        while len(self.pending) < self.size:
+            seed = randrange(1 << 32)
+            x = randrange(self.width)
+            y = randrange(self.height)
+            job = self.workers.apply_async(generate, (self.width, self.height, self.bombs, x, y, seed))
+            self.pending.append((seed, x, y, job))
+
+    #Hand out a finished board if there is one, waiting on the oldest otherwise. Returns (board, (x, y))
+    def take(self):
+        for entry in self.pending:
+            if entry[3].ready():
+                break
+        else:
+            entry = self.pending[0]
+        self.pending.remove(entry)
+
+        seed, x, y, job = entry
+        mines, solved = job.get()
+        self.fill()
+
+        #A layout that ran out of attempts may need guessing, so it is handed out as an ordinary board
+        board = Board.from_mines(self.width, self.height, mines, seed)
+        board.no_guess = solved
+        return board, (x, y)
+
+    def close(self):
+        self.workers.terminate()
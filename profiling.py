@@ -0,0 +1,166 @@
+import functools
+import json
+import time
+from contextlib import contextmanager
+
+import sweeper
+
+#Opt in timing of the hot paths. enable() swaps timed wrappers in for the methods below and disable() puts the
+#originals back, so nothing is measured, or slowed down, unless it has been turned on.
+#Timers count calls and seconds per method. Samples keep one value per event:
+# - cells_per_click, tiles a click or chord opened, cascades included
+# - items_per_frame, canvas items created between two paints of the window
+# - event_to_paint, seconds from a mouse event reaching the App to the window being painted after it
+BOARD_METHODS = ['click', 'auto_click', 'flag', 'cascade', 'bombs_around', 'gen_board', 'count_board']
+APP_METHODS = ['create_gui', 'draw_tiles', 'refresh_view', 'update_tiles']
+APP_EVENTS = ['left_release', 'middle_release', 'right_release', 'wheel_scroll']
+
+class Metrics:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.timers = {}
+        self.samples = {}
+        self.items = 0
+
+    def time(self, name, seconds):
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = [0, 0.0, 0.0]
+        timer[0] += 1
+        timer[1] += seconds
+        if seconds > timer[2]:
+            timer[2] = seconds
+
+    def sample(self, name, value):
+        self.samples.setdefault(name, []).append(value)
+
+    def report(self):
+        timers = {}
+        for name, (calls, seconds, longest) in sorted(self.timers.items()):
+            timers[name] = {'calls': calls, 'seconds': seconds, 'mean': seconds/calls, 'max': longest}
+
+        samples = {}
+        for name, values in sorted(self.samples.items()):
+            ordered = sorted(values)
+            samples[name] = {
+                'count': len(ordered),
+                'total': sum(ordered),
+                'mean': sum(ordered)/len(ordered),
+                'p50': ordered[len(ordered)//2],
+                'p99': ordered[min(len(ordered)-1, len(ordered)*99//100)],
+                'max': ordered[-1],
+            }
+
+        return {'timers': timers, 'samples': samples}
+
+metrics = Metrics()
+
+#(owner, name, attribute) for every method currently swapped out, so disable can put them back
+_patched = []
+
+def _replace(owner, name, make):
+    raw = owner.__dict__[name]
+    static = isinstance(raw, staticmethod)
+    function = raw.__func__ if static else raw
+
+    wrapper = functools.wraps(function)(make(function))
+    setattr(owner, name, staticmethod(wrapper) if static else wrapper)
+    _patched.append((owner, name, raw))
+
+def _timed(label):
+    def make(function):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                metrics.time(label, time.perf_counter() - start)
+        return timed
+    return make
+
+#Clicks and chords also record how many tiles they opened
+def _counted(label):
+    def make(function):
+        def counted(board, x, y):
+            opened = board.opened
+            start = time.perf_counter()
+            try:
+                return function(board, x, y)
+            finally:
+                metrics.time(label, time.perf_counter() - start)
+                metrics.sample('cells_per_click', board.opened - opened)
+        return counted
+    return make
+
+#Idle callbacks run once Tk has redrawn what the handler changed, so one scheduled from the end of a handler marks
+#the paint that event caused
+def _painted(label):
+    def make(function):
+        def handler(app, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(app, *args, **kwargs)
+            finally:
+                metrics.time(label, time.perf_counter() - start)
+                app.after_idle(_frame, start)
+        return handler
+    return make
+
+def _frame(start):
+    metrics.sample('event_to_paint', time.perf_counter() - start)
+    metrics.sample('items_per_frame', metrics.items)
+    metrics.items = 0
+
+def enabled():
+    return bool(_patched)
+
+#Start measuring Board, and the GUI as well when given the App class. Metrics gathered so far are kept
+def enable(app=None):
+    if enabled():
+        disable()
+
+    for name in BOARD_METHODS:
+        label = 'Board.' + name
+        _replace(sweeper.Board, name, _counted(label) if name in ('click', 'auto_click') else _timed(label))
+
+    if app is not None:
+        import tkinter
+
+        for name in APP_METHODS:
+            _replace(app, name, _timed('App.' + name))
+        for name in APP_EVENTS:
+            _replace(app, name, _painted('App.' + name))
+
+        #Every create_* method of a canvas goes through _create
+        def make(function):
+            def create(*args, **kwargs):
+                metrics.items += 1
+                return function(*args, **kwargs)
+            return create
+        _replace(tkinter.Canvas, '_create', make)
+
+def disable():
+    while _patched:
+        owner, name, raw = _patched.pop()
+        setattr(owner, name, raw)
+
+def reset():
+    metrics.reset()
+
+def report():
+    return metrics.report()
+
+def dump(path):
+    with open(path, 'w') as f:
+        json.dump(report(), f, indent=2)
+
+#Measure only the code inside a with block
+@contextmanager
+def profile(app=None):
+    enable(app)
+    try:
+        yield metrics
+    finally:
+        disable()
@@ -0,0 +1,160 @@
+import struct
+import sys
+import time
+from array import array
+
+from sweeper import Board, Snapshot
+
+OPS = ['click', 'flag', 'chord']
+_CODES = {op: code for code, op in enumerate(OPS)}
+
+#Journal files are this header, the starting board in the save format, then the move arrays one after another
+JOURNAL_MAGIC = b'PSWJ'
+JOURNAL_VERSION = 1
+_HEADER = struct.Struct('<4sHII')
+
+#A record of a game: the board as it stood when recording started, then every click, flag and chord with its time in
+#seconds since the first move. Moves go into flat arrays rather than a list of tuples so long sessions stay small
+class Journal:
+    def __init__(self, start, ops=None, xs=None, ys=None, times=None):
+        self.start = start
+        self.ops = ops if ops is not None else array('B')
+        self.xs = xs if xs is not None else array('I')
+        self.ys = ys if ys is not None else array('I')
+        self.times = times if times is not None else array('d')
+
+        #time.monotonic() of the first move, set once recording starts
+        self.clock = None
+
+    #Start recording the moves made on a board
+    @classmethod
+    def attach(cls, board):
+        journal = cls(board.to_bytes())
+        board.journal = journal
+        return journal
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __repr__(self):
+        return 'Journal(seed={}, moves={})'.format(self.seed, len(self))
+
+    @property
+    def seed(self):
+        return Snapshot(data=self.start).seed
+
+    #Time of the last move, which is how long the game took when it ends in a win
+    @property
+    def elapsed(self):
+        return self.times[-1] if self.times else 0.0
+
+    def record(self, op, x, y):
+        now = time.monotonic()
+        if self.clock is None:
+            self.clock = now - self.elapsed
+
+        self.ops.append(_CODES[op])
+        self.xs.append(x)
+        self.ys.append(y)
+        self.times.append(now - self.clock)
+
+    #The nth move as (op, x, y, seconds)
+    def move(self, n):
+        return OPS[self.ops[n]], self.xs[n], self.ys[n], self.times[n]
+
+    def arrays(self):
+        return self.ops, self.xs, self.ys, self.times
+
+    def to_bytes(self):
+        parts = [_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, len(self.start), len(self)), self.start]
+        for values in self.arrays():
+            #Files are little endian whatever machine wrote them
+            if sys.byteorder == 'big':
+                values = array(values.typecode, values)
+                values.byteswap()
+            parts.append(values.tobytes())
+
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, start_size, moves = _HEADER.unpack_from(data)
+        if magic != JOURNAL_MAGIC:
+            raise ValueError('Not a PySweeper journal')
+        if version > JOURNAL_VERSION:
+            raise ValueError('Journal was written by a newer version (format {})'.format(version))
+
+        offset = _HEADER.size
+        start = bytes(data[offset:offset+start_size])
+        offset += start_size
+
+        values = []
+        for typecode in ['B', 'I', 'I', 'd']:
+            column = array(typecode)
+            size = column.itemsize*moves
+            column.frombytes(data[offset:offset+size])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            values.append(column)
+            offset += size
+
+        return cls(start, *values)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+#Rebuilds the board at any point of a journal. Every interval moves the board is kept in the save format the first
+#time replay passes that point, so reaching a later move starts from the nearest checkpoint instead of move 0
+class Replay:
+    def __init__(self, journal, interval=256):
+        self.journal = journal
+        self.interval = interval
+        self.checkpoints = {0: journal.start}
+
+    #Make the nth move on a board, returns whether a bomb went off
+    def apply(self, board, n):
+        op, x, y = OPS[self.journal.ops[n]], self.journal.xs[n], self.journal.ys[n]
+        if op == 'click':
+            return board.click(x, y) == 1
+        elif op == 'flag':
+            board.flag(x, y)
+            return False
+        else:
+            return board.auto_click(x, y)
+
+    #The board as it stood after the first n moves
+    def board_at(self, n):
+        assert 0 <= n <= len(self.journal), "The journal only has {} moves".format(len(self.journal))
+
+        interval = self.interval
+        base = n - n % interval
+        while base not in self.checkpoints:
+            base -= interval
+
+        board = Board.from_bytes(self.checkpoints[base])
+        for i in range(base, n):
+            self.apply(board, i)
+            if (i+1) % interval == 0 and i+1 not in self.checkpoints:
+                self.checkpoints[i+1] = board.to_bytes()
+
+        return board
+
+    def final(self):
+        return self.board_at(len(self.journal))
+
+    #Replay the whole game and return the time it was won in, or None if it doesn't end in a win.
+    #A game that carries on after a bomb went off, or after it was already won, doesn't count
+    def verify(self):
+        board = Board.from_bytes(self.journal.start)
+        for n in range(len(self.journal)):
+            if board.won or self.apply(board, n):
+                return None
+
+        if board.won:
+            return self.journal.elapsed
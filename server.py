@@ -0,0 +1,214 @@
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+import sweeper
+
+#Line delimited JSON over TCP, one request per line and one response line for each, in order.
+#Requests carry an "op" and may carry an "id", which is echoed back:
+# - new: {"width", "height", "mines", "seed"} all optional, defaults to expert. Answers with the "session" id
+# - click, flag, chord: {"session", "x", "y"}. Answers with the move's "result", the game "state"
+#   (playing, won or lost) and "changed", [x, y, cell] for every cell that looks different since the last answer
+# - state: {"session"}. Answers with the whole board as "rows" of cells, and starts the next diff from here
+# - close: {"session"}. Ends a session
+# - stats: sessions held, requests served and the server's CPU time
+#Cells are '#' closed, 'F' flagged, '$' a bomb and '0' to '8' a number. Failures answer {"ok": false, "error"}
+MAX_CELLS = 1 << 20
+
+class RequestError(Exception):
+    pass
+
+def cell(board, i):
+    if board.flags[i]:
+        return 'F'
+    if not board.revealed[i]:
+        return '#'
+    if board.mines[i]:
+        return '$'
+    return str(board.counts[i])
+
+#The whole board as rows of cells, rendered in one pass by Board.row_text with the flags laid over it
+def rows(board):
+    text = bytearray(board.row_text(0, board.height))
+    i = board.flags.find(1)
+    while i != -1:
+        text[i] = ord('F')
+        i = board.flags.find(1, i+1)
+
+    text = text.decode('ascii')
+    width = board.width
+    return [text[y*width:(y+1)*width] for y in range(board.height)]
+
+class Session:
+    def __init__(self, board):
+        self.board = board
+        self.state = 'playing'
+        self.used = time.monotonic()
+
+#Holds every game in one process. The boards are only touched from the event loop, so no locking is needed
+class Server:
+    def __init__(self, max_sessions=100000, idle=600):
+        self.max_sessions = max_sessions
+        self.idle = idle
+
+        self.sessions = {}
+        self.ids = itertools.count(1)
+        self.requests = 0
+
+    def integer(self, request, name, default=None, low=0, high=None):
+        value = request.get(name, default)
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise RequestError('{} must be an integer'.format(name))
+        if value < low or (high is not None and value > high):
+            raise RequestError('{} is out of range'.format(name))
+        return value
+
+    def session(self, request):
+        session_id = request.get('session')
+        session = self.sessions.get(session_id) if isinstance(session_id, str) else None
+        if session is None:
+            raise RequestError('No such session')
+        session.used = time.monotonic()
+        return session
+
+    def new(self, request):
+        if len(self.sessions) >= self.max_sessions:
+            raise RequestError('Too many sessions')
+
+        width = self.integer(request, 'width', 30, 1, MAX_CELLS)
+        height = self.integer(request, 'height', 16, 1, MAX_CELLS//width)
+        mines = self.integer(request, 'mines', 99, 0, max(0, width*height - 9))
+        seed = request.get('seed')
+        if seed is not None:
+            seed = self.integer(request, 'seed', high=(1 << 63) - 1)
+
+        session_id = str(next(self.ids))
+        self.sessions[session_id] = Session(sweeper.Board(width, height, mines, seed=seed, lazy=True))
+        return {'session': session_id, 'width': width, 'height': height, 'mines': mines}
+
+    def move(self, request):
+        session = self.session(request)
+        board = session.board
+        x = self.integer(request, 'x', high=board.width-1)
+        y = self.integer(request, 'y', high=board.height-1)
+        if session.state != 'playing':
+            raise RequestError('The game is over')
+
+        op = request['op']
+        if op == 'click':
+            result = board.click(x, y)
+            exploded = result == 1
+        elif op == 'flag':
+            result = board.flag(x, y)
+            exploded = False
+        else:
+            result = exploded = board.auto_click(x, y)
+
+        if exploded:
+            session.state = 'lost'
+        elif board.won:
+            session.state = 'won'
+
+        width = board.width
+        changed = [[x, y, cell(board, y*width + x)] for x, y in board.take_changes()]
+        return {'result': result, 'state': session.state, 'changed': changed}
+
+    def state(self, request):
+        session = self.session(request)
+        board = session.board
+        board.take_changes()
+        return {'state': session.state, 'width': board.width, 'height': board.height, 'mines': board.bomb_count,
+                'flagged': board.flagged, 'rows': rows(board)}
+
+    def close(self, request):
+        self.session(request)
+        del self.sessions[request['session']]
+        return {}
+
+    def stats(self, request):
+        return {'sessions': len(self.sessions), 'requests': self.requests, 'cpu': time.process_time()}
+
+    #Answer one request line
+    def handle(self, line):
+        self.requests += 1
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {'ok': False, 'error': 'Bad JSON'}
+        if not isinstance(request, dict):
+            return {'ok': False, 'error': 'Requests must be JSON objects'}
+
+        op = request.get('op')
+        try:
+            if op == 'new':
+                response = self.new(request)
+            elif op in ('click', 'flag', 'chord'):
+                response = self.move(request)
+            elif op == 'state':
+                response = self.state(request)
+            elif op == 'close':
+                response = self.close(request)
+            elif op == 'stats':
+                response = self.stats(request)
+            else:
+                raise RequestError('Unknown op {!r}'.format(op))
+            response['ok'] = True
+        except RequestError as e:
+            response = {'ok': False, 'error': str(e)}
+
+        if 'id' in request:
+            response['id'] = request['id']
+        return response
+
+    async def client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(json.dumps(self.handle(line), separators=(',', ':')).encode() + b'\n')
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    #Drop sessions nobody has touched for idle seconds
+    async def reap(self):
+        while True:
+            await asyncio.sleep(min(60, self.idle))
+            cutoff = time.monotonic() - self.idle
+            for session_id in [key for key, session in self.sessions.items() if session.used < cutoff]:
+                del self.sessions[session_id]
+
+    async def serve(self, host, port, ready=None):
+        server = await asyncio.start_server(self.client, host, port)
+        reaper = asyncio.ensure_future(self.reap())
+        if ready is not None:
+            ready()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            reaper.cancel()
+
+def run(host='127.0.0.1', port=8765, max_sessions=100000, idle=600, ready=None):
+    asyncio.run(Server(max_sessions, idle).serve(host, port, ready))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve PySweeper games over line delimited JSON')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-sessions', type=int, default=100000)
+    parser.add_argument('--idle', type=float, default=600, help='seconds before an untouched session is dropped')
+    args = parser.parse_args(argv)
+
+    try:
+        run(args.host, args.port, args.max_sessions, args.idle)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
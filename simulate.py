@@ -0,0 +1,150 @@
+import argparse
+import csv
+import importlib
+import json
+import multiprocessing
+import sys
+import time
+from random import Random
+
+import sweeper
+from solver import solver_policy
+
+FIELDS = ['seed', 'won', 'moves', 'revealed', 'seconds']
+
+#A policy is called with a board and a Random and yields moves as (op, x, y), op being 'click', 'flag' or 'chord'.
+#It is a generator so it can keep whatever it learns about the board between moves. Running out of moves ends the game
+
+#Click tiles that are neither revealed nor flagged at random
+def random_policy(board, rng):
+    width = board.width
+    size = width*board.height
+    revealed = board.revealed
+    flags = board.flags
+
+    while True:
+        for _ in range(64):
+            i = rng.randrange(size)
+            if not revealed[i] and not flags[i]:
+                break
+        else:
+            #Random picks keep landing on open tiles late in the game, so fall back to the first closed one
+            for i in range(size):
+                if not revealed[i] and not flags[i]:
+                    break
+            else:
+                return
+
+        yield 'click', i % width, i // width
+
+POLICIES = {
+    'random': random_policy,
+    'solver': solver_policy,
+}
+
+#Look a policy up by name, or import it from a module:function spec
+def load_policy(name):
+    if name in POLICIES:
+        return POLICIES[name]
+
+    module, _, attr = name.partition(':')
+    return getattr(importlib.import_module(module), attr)
+
+#Play a single game to the end and report how it went
+def play_game(width, height, bombs, seed, policy, lazy=True, max_moves=None):
+    start = time.perf_counter()
+    board = sweeper.Board(width, height, bombs, seed=seed, lazy=lazy)
+    moves = 0
+    exploded = False
+
+    for op, x, y in policy(board, Random(seed)):
+        moves += 1
+        if op == 'click':
+            exploded = board.click(x, y) == 1
+        elif op == 'flag':
+            board.flag(x, y)
+        elif op == 'chord':
+            exploded = board.auto_click(x, y)
+        else:
+            raise ValueError('Unknown move {!r}'.format(op))
+
+        if exploded or board.won or moves == max_moves:
+            break
+
+    return {
+        'seed': seed,
+        'won': board.won,
+        'moves': moves,
+        'revealed': board.opened,
+        'seconds': time.perf_counter() - start,
+    }
+
+#Pool workers only get picklable arguments, so the policy travels by name
+def _play(job):
+    width, height, bombs, seed, policy, lazy, max_moves = job
+    return play_game(width, height, bombs, seed, load_policy(policy), lazy, max_moves)
+
+#Play a game for every seed across a process pool, handing each result to write as soon as it comes back.
+#Results arrive in completion order, not seed order. Returns (games, wins, seconds)
+def run(width, height, bombs, seeds, policy='random', processes=None, lazy=True, max_moves=None, write=None, chunksize=64):
+    jobs = ((width, height, bombs, seed, policy, lazy, max_moves) for seed in seeds)
+    games = wins = 0
+
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        for result in pool.imap_unordered(_play, jobs, chunksize):
+            games += 1
+            wins += result['won']
+            if write is not None:
+                write(result)
+
+    return games, wins, time.perf_counter() - start
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+def parse_seeds(text):
+    first, _, last = text.partition(':')
+    if not last:
+        return range(int(first))
+    return range(int(first), int(last))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Play PySweeper games without the GUI')
+    parser.add_argument('--size', type=parse_size, default=(30, 16), help='board size as WIDTHxHEIGHT')
+    parser.add_argument('--mines', type=int, default=99)
+    parser.add_argument('--seeds', type=parse_seeds, default=range(1000), help='N for seeds 0 to N-1, or FIRST:LAST')
+    parser.add_argument('--policy', default='random', help='one of {} or module:function'.format(', '.join(sorted(POLICIES))))
+    parser.add_argument('--processes', type=int, default=None, help='worker processes, defaults to one per core')
+    parser.add_argument('--eager', action='store_true', help='deal bombs up front, so the first click can lose')
+    parser.add_argument('--max-moves', type=int, default=None)
+    parser.add_argument('--output', default=None, help='write per game results to this file, CSV if it ends in .csv and JSON lines otherwise')
+    args = parser.parse_args(argv)
+
+    load_policy(args.policy)
+    width, height = args.size
+    processes = args.processes or multiprocessing.cpu_count()
+
+    out = open(args.output, 'w', newline='') if args.output else None
+    try:
+        if out is None:
+            write = None
+        elif args.output.endswith('.csv'):
+            writer = csv.DictWriter(out, FIELDS)
+            writer.writeheader()
+            write = writer.writerow
+        else:
+            write = lambda result: out.write(json.dumps(result) + '\n')
+
+        games, wins, seconds = run(width, height, args.mines, args.seeds, args.policy, processes, not args.eager, args.max_moves, write)
+    finally:
+        if out is not None:
+            out.close()
+
+    rate = games/seconds if seconds else 0.0
+    print('{} games, {} won ({:.1%}) in {:.2f}s'.format(games, wins, wins/games if games else 0.0, seconds), file=sys.stderr)
+    print('{:.0f} games/s over {} processes, {:.0f} games/s per core'.format(rate, processes, rate/processes), file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+import hashlib
+import os
+import struct
+import tkinter
+
+#Where each sprite sits in a skin bitmap, boxes are (left, top, right, bottom) with right and bottom excluded
+SPRITES = {
+    'revealed': [(16*i, 0, 16*i+16, 16) for i in range(9)],
+    'tiles': [(16*i, 16, 16*i+16, 32) for i in range(8)],
+    'numbers': [(12*i, 33, 12*i+11, 54) for i in range(11)],
+    'faces': [(27*i, 55, 27*i+25, 81) for i in range(5)],
+}
+
+#Where each piece of the window frame sits in the skin bitmap
+FRAME_PIECES = [
+    ('display_field', (28, 82, 69, 107)),
+    ('blank_space', (0, 0, 14, 14)),
+
+    ('top_left', (0, 82, 12, 93)),
+    ('top_right', (15, 82, 27, 93)),
+    ('middle_left', (0, 96, 12, 107)),
+    ('middle_right', (15, 96, 27, 107)),
+    ('bottom_left', (0, 110, 11, 122)),
+    ('bottom_right', (15, 110, 27, 122)),
+
+    ('top_slice', (13, 82, 14, 93)),
+    ('upper_left_slice', (0, 94, 12, 95)),
+    ('upper_right_slice', (15, 94, 27, 95)),
+    ('middle_slice', (13, 96, 14, 107)),
+    ('lower_left_slice', (0, 108, 12, 109)),
+    ('lower_right_slice', (15, 108, 27, 109)),
+    ('bottom_slice', (13, 110, 14, 122)),
+]
+
+CACHE_DIR = os.environ.get('PYSWEEPER_SKIN_CACHE', 'skin_cache')
+
+#Turn an uncompressed 24 or 32 bit BMP into a binary PPM, which Tk reads natively without PIL
+def bmp_to_ppm(data):
+    if data[:2] != b'BM' or len(data) < 34:
+        raise ValueError('Not a BMP file')
+
+    offset, = struct.unpack_from('<I', data, 10)
+    _, width, height, _, bits, compression = struct.unpack_from('<IiiHHI', data, 14)
+    if bits not in (24, 32) or compression not in (0, 3):
+        raise ValueError('Only uncompressed 24 and 32 bit bitmaps are supported')
+
+    #Rows are padded to 4 bytes and stored bottom up unless the height is negative
+    step = bits//8
+    stride = (width*step + 3) & ~3
+    rows = range(height-1, -1, -1) if height > 0 else range(-height)
+
+    pixels = bytearray()
+    for row in rows:
+        start = offset + row*stride
+        line = data[start:start + width*step]
+        #BMP pixels are stored as BGR(A)
+        rgb = bytearray(3*width)
+        rgb[0::3] = line[2::step]
+        rgb[1::3] = line[1::step]
+        rgb[2::3] = line[0::step]
+        pixels += rgb
+
+    return b'P6\n%d %d\n255\n' % (width, abs(height)) + bytes(pixels)
+
+#The atlas for a skin: the bitmap converted once and kept in the cache under a hash of its contents, so editing
+#or replacing a skin file picks up a fresh atlas and unchanged skins are never converted again
+def atlas_path(path, cache=CACHE_DIR):
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    atlas = os.path.join(cache, hashlib.sha1(data).hexdigest() + '.ppm')
+    if not os.path.exists(atlas):
+        os.makedirs(cache, exist_ok=True)
+        temp = atlas + '.tmp'
+        with open(temp, 'wb') as f:
+            f.write(bmp_to_ppm(data))
+        os.replace(temp, atlas)
+
+    return atlas
+
+#Every sprite of a skin, cut out of the atlas image by Tk in a single load.
+#Frames are composited from the pieces once for each window size
+class Skin:
+    def __init__(self, master, path, cache=CACHE_DIR):
+        self.path = path
+        self.master = master
+        self.atlas = tkinter.PhotoImage(master=master, file=atlas_path(path, cache))
+
+        for name, boxes in SPRITES.items():
+            setattr(self, name, [self.crop(box) for box in boxes])
+        self.pieces = {name: self.crop(box) for name, box in FRAME_PIECES}
+
+        left, top, _, bottom = dict(FRAME_PIECES)['blank_space']
+        self.blank_column = self.crop((left, top, left+1, bottom))
+
+        #(width, height) -> composited frame image
+        self.frames = {}
+
+    def crop(self, box):
+        left, top, right, bottom = box
+        image = tkinter.PhotoImage(master=self.master, width=right-left, height=bottom-top)
+        image.tk.call(image, 'copy', self.atlas, '-from', left, top, right, bottom)
+        return image
+
+    def frame(self, width, height):
+        size = (width, height)
+        if size not in self.frames:
+            self.frames[size] = self.compose_frame(width, height)
+        return self.frames[size]
+
+    #Lay the frame pieces out on one image. Copying a piece into a bigger region tiles it, which stretches
+    #the one pixel slices over the edges between corners
+    def compose_frame(self, width, height):
+        p = self.pieces
+        frame = tkinter.PhotoImage(master=self.master, width=width, height=height)
+
+        def paste(piece, x, y, w=None, h=None):
+            w = piece.width() if w is None else w
+            h = piece.height() if h is None else h
+            frame.tk.call(frame, 'copy', piece, '-to', x, y, x+w, y+h)
+
+        header = p['top_left'].height()
+        body = header+33+p['middle_left'].height()
+
+        paste(p['top_left'], 0, 0)
+        paste(p['top_right'], width-p['top_right'].width(), 0)
+        paste(p['bottom_left'], 0, height-p['bottom_left'].height())
+        paste(p['bottom_right'], width-p['bottom_right'].width(), height-p['bottom_right'].height())
+
+        paste(p['middle_left'], 0, header+33)
+        paste(p['middle_right'], width-p['middle_right'].width(), header+33)
+
+        span = width-p['bottom_right'].width()-p['bottom_left'].width()
+        paste(p['bottom_slice'], p['bottom_left'].width(), height-p['bottom_slice'].height(), w=span)
+        paste(p['top_slice'], p['top_left'].width(), 0, w=span)
+        paste(p['middle_slice'], p['middle_left'].width(), header+33, w=span)
+
+        paste(p['upper_left_slice'], 0, header, h=33)
+        paste(p['upper_right_slice'], width-p['upper_right_slice'].width(), header, h=33)
+
+        span = height-body-p['bottom_left'].height()
+        if span > 0:
+            paste(p['lower_left_slice'], 0, body, h=span)
+            paste(p['lower_right_slice'], width-p['lower_right_slice'].width(), body, h=span)
+
+        #Blank header strip behind the counters and the face, its first column run up to a full square at the end
+        top = p['top_slice'].height()
+        left = p['upper_left_slice'].width()
+        right = width-p['upper_right_slice'].width()-13
+        if right > left:
+            for i in [0, 14, 19]:
+                if right-1 > left:
+                    paste(self.blank_column, left, top+i, w=right-1-left)
+                paste(p['blank_space'], right-1, top+i)
+
+        paste(p['display_field'], p['upper_left_slice'].width()+5, top+4)
+        paste(p['display_field'], width-p['upper_right_slice'].width()-5-p['display_field'].width(), top+4)
+
+        return frame
@@ -0,0 +1,271 @@
+from random import Random
+
+#Plays a Board by logic, guessing only when nothing can be deduced.
+#Knowledge is kept per cell as flat indexes (y*width + x):
+# - mines, tiles worked out to be bombs (the solver never flags them on the board)
+# - safe, tiles worked out to be safe and not clicked yet
+# - frontier, revealed numbers that still have closed tiles around them
+# - dirty, frontier numbers whose surroundings changed since they were last looked at
+#The solver learns what each move revealed from Board.take_changes, so nothing else should be taking them meanwhile.
+#Moves come out of next_move as (op, x, y) like a simulate.py policy
+class Solver:
+    def __init__(self, board, rng=None):
+        self.board = board
+        self.rng = rng if rng is not None else Random(board.seed)
+
+        self.mines = set()
+        self.safe = set()
+        self.frontier = set()
+        self.dirty = set()
+
+        width = board.width
+        self.offsets = (-width-1, -width, -width+1, -1, 1, width-1, width, width+1)
+
+        revealed = board.revealed
+        cells = []
+        i = revealed.find(1)
+        while i != -1:
+            cells.append(i)
+            i = revealed.find(1, i+1)
+        self.observe(cells)
+
+    #Flat indexes around a tile, the common case of a tile away from the edges is just a fixed set of offsets
+    def around(self, i):
+        width = self.board.width
+        y, x = divmod(i, width)
+        if 0 < x < width-1 and 0 < y < self.board.height-1:
+            return [i+offset for offset in self.offsets]
+        return self.board.neighbours(x, y)
+
+    #Take in newly revealed tiles. Numbers join the frontier, and numbers already there next to them need another look
+    def observe(self, cells):
+        board = self.board
+        counts = board.counts
+        mines = board.mines
+        frontier = self.frontier
+        dirty = self.dirty
+
+        #A huge cascade touches most of the frontier anyway, so skip looking up neighbours tile by tile
+        touch_all = len(cells) > 8*len(frontier)
+        for i in cells:
+            if mines[i]:
+                continue
+            if counts[i]:
+                frontier.add(i)
+                dirty.add(i)
+            if not touch_all:
+                for n in self.around(i):
+                    if n in frontier:
+                        dirty.add(n)
+
+        if touch_all:
+            dirty.update(frontier)
+
+    #Catch up with whatever the last moves revealed
+    def refresh(self):
+        width = self.board.width
+        self.observe([y*width + x for x, y in self.board.take_changes() if self.board.revealed[y*width + x]])
+
+    def mark_mine(self, i):
+        self.mines.add(i)
+        frontier = self.frontier
+        for n in self.around(i):
+            if n in frontier:
+                self.dirty.add(n)
+
+    #Closed tiles around a number that aren't known bombs, and how many bombs are still unaccounted for among them
+    def constraint(self, i):
+        revealed = self.board.revealed
+        mines = self.mines
+
+        closed = []
+        need = self.board.counts[i]
+        for n in self.around(i):
+            if n in mines:
+                need -= 1
+            elif not revealed[n]:
+                closed.append(n)
+
+        return closed, need
+
+    #The rules auto_click relies on: a number with all its bombs found has only safe tiles left around it,
+    #and one with as many closed tiles as missing bombs has only bombs left
+    def check(self, i):
+        closed, need = self.constraint(i)
+        if not closed:
+            self.frontier.discard(i)
+        elif need == 0:
+            self.safe.update(closed)
+        elif need == len(closed):
+            for n in closed:
+                self.mark_mine(n)
+
+    #Compare numbers that share closed tiles. With A and B the closed tiles around two numbers, if B's missing
+    #bombs minus A's equals the count of tiles only B has, those are all bombs and the tiles only A has are safe.
+    #That covers the subset rule as well, from either side. Returns whether anything was learnt
+    def reduce(self):
+        constraints = {}
+        touching = {}
+        for i in self.frontier:
+            closed, need = self.constraint(i)
+            if closed:
+                constraints[i] = (frozenset(closed), need)
+                for n in closed:
+                    touching.setdefault(n, []).append(i)
+
+        found_safe = set()
+        found_mines = set()
+        for a, (cells_a, need_a) in constraints.items():
+            others = set()
+            for n in cells_a:
+                others.update(touching[n])
+            others.discard(a)
+
+            for b in others:
+                cells_b, need_b = constraints[b]
+                only_b = cells_b - cells_a
+                if need_b - need_a == len(only_b):
+                    found_mines.update(only_b)
+                    found_safe.update(cells_a - cells_b)
+
+        found_safe -= found_mines
+        self.safe.update(found_safe)
+        for n in found_mines - self.mines:
+            self.mark_mine(n)
+
+        return bool(found_safe or found_mines) or self.count_rule()
+
+    #Once every bomb is accounted for the rest of the board is safe, and when the closed tiles left are exactly the
+    #bombs left they are all bombs. Only worth the board scan near the end, when these can fire
+    def count_rule(self):
+        board = self.board
+        left = board.bomb_count - len(self.mines)
+        unknown = board.width*board.height - board.opened - len(self.mines)
+        if left and left != unknown:
+            return False
+
+        revealed = board.revealed
+        cells = [i for i in range(board.width*board.height) if not revealed[i] and i not in self.mines]
+        if not cells:
+            return False
+        if left:
+            for n in cells:
+                self.mark_mine(n)
+        else:
+            self.safe.update(cells)
+
+        return True
+
+    #Work through the dirty numbers, falling back to comparing constraints. Returns whether there are safe tiles to click
+    def deduce(self):
+        while True:
+            while self.dirty and not self.safe:
+                i = self.dirty.pop()
+                if i in self.frontier:
+                    self.check(i)
+
+            if self.safe:
+                return True
+            if not self.reduce() and not self.dirty:
+                return bool(self.safe)
+
+    #Nothing is certain, so click the frontier tile least likely to be a bomb, rating each tile by the worst of the
+    #numbers around it. Tiles away from the frontier rarely open anything useful, so they are only tried when the
+    #frontier has nothing closed left
+    def guess(self):
+        board = self.board
+        unknown = board.width*board.height - board.opened - len(self.mines)
+        if unknown <= 0:
+            return None
+
+        odds = {}
+        for i in self.frontier:
+            closed, need = self.constraint(i)
+            for n in closed:
+                p = need/len(closed)
+                if p > odds.get(n, -1):
+                    odds[n] = p
+
+        if not odds:
+            return self.interior_tile()
+
+        lowest = min(odds.values())
+        return self.rng.choice(sorted(n for n, p in odds.items() if p == lowest))
+
+    #A random closed tile that isn't next to any number
+    def interior_tile(self):
+        board = self.board
+        size = board.width*board.height
+        revealed = board.revealed
+
+        def interior(i):
+            return not revealed[i] and i not in self.mines and not any(revealed[n] for n in self.around(i))
+
+        for _ in range(64):
+            i = self.rng.randrange(size)
+            if interior(i):
+                return i
+        for i in range(size):
+            if interior(i):
+                return i
+
+    #Next move that is certain not to hit a bomb, or None when logic has run out
+    def safe_move(self):
+        board = self.board
+        width = board.width
+        self.refresh()
+
+        #Safe tiles may have been opened by a cascade since they were found, so keep deducing until one is still closed
+        while self.safe or self.deduce():
+            i = self.safe.pop()
+            if board.revealed[i]:
+                continue
+            #Someone else's flag is in the way of a safe click, take it off first
+            if board.flags[i]:
+                self.safe.add(i)
+                return 'flag', i % width, i // width
+            return 'click', i % width, i // width
+
+    def next_move(self):
+        board = self.board
+        width = board.width
+
+        if not board.opened:
+            return 'click', width//2, board.height//2
+
+        move = self.safe_move()
+        if move is not None:
+            return move
+
+        i = self.guess()
+        if i is None:
+            return None
+        if board.flags[i]:
+            return 'flag', i % width, i // width
+        return 'click', i % width, i // width
+
+#simulate.py policy playing the solver's moves
+def solver_policy(board, rng):
+    solver = Solver(board, rng)
+    while True:
+        move = solver.next_move()
+        if move is None:
+            return
+        yield move
+
+#Play a board to the end, returns 1 if it was won and 0 if a bomb went off.
+#Without guess, play stops at the first position logic can't get past and 0 is returned as well
+def solve(board, rng=None, guess=True):
+    solver = Solver(board, rng)
+    while not board.won:
+        move = solver.next_move() if guess or not board.opened else solver.safe_move()
+        if move is None:
+            break
+
+        op, x, y = move
+        if op == 'flag':
+            board.flag(x, y)
+        elif board.click(x, y):
+            return 0
+
+    return int(board.won)